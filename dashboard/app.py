@@ -4,13 +4,14 @@ import pandas as pd
 from datetime import datetime
 import sys
 import os
-import json
 import time
 import importlib
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.core.database import DatabaseManager
+from src.core import json_codec
+import src.tests.system_check as system_check
 
 st.set_page_config(page_title="Rito Control Panel", layout="wide", page_icon="🤖")
 
@@ -27,6 +28,59 @@ def get_db():
 
 db = get_db()
 
+# Shared read connection (WAL allows reading while the bot/agent writes)
+@st.cache_resource
+def get_conn():
+    conn = sqlite3.connect(db.db_path, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    for pragma in db.PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+@st.cache_data(ttl=60)
+def _run_all_checks():
+    """System check results, reused for 60s so repeated clicks don't re-probe every service."""
+    return system_check.run_all_checks()
+
+PAGE_SIZE = 50
+
+def show_paged(sql, params=(), key="", empty_message="No rows found."):
+    """Renders one page of `sql` (an ORDER BY query without LIMIT) with a page selector."""
+    page_no = st.number_input("Page", min_value=1, step=1, key=f"page_{key}")
+    df = pd.read_sql_query(
+        f"{sql} LIMIT ? OFFSET ?",
+        get_conn(),
+        params=(*params, PAGE_SIZE, (page_no - 1) * PAGE_SIZE),
+        parse_dates={'timestamp': {'unit': 's'}}
+    )
+    if not df.empty:
+        st.data_editor(df, disabled=True, hide_index=True, use_container_width=True, key=f"table_{key}")
+    elif page_no == 1:
+        st.info(empty_message)
+    else:
+        st.info("No more rows.")
+
+@st.cache_data
+def load_personas(persona_version: int):
+    """All personas, cached per persona_version so edits from any process (scripts, editor) show up."""
+    return [dict(r) for r in get_conn().execute("SELECT * FROM personas").fetchall()]
+
+@st.cache_data(ttl=30)
+def load_users():
+    """All users; refreshed every 30s (the Discord bot adds users) and cleared on dashboard edits."""
+    return [dict(r) for r in get_conn().execute("SELECT * FROM users").fetchall()]
+
+@st.cache_data(ttl=5)
+def cfg(keys, default=None):
+    """Config values for a tuple of keys, fetched in one query; cleared after set_config."""
+    return db.get_configs(list(keys), default)
+
+@st.cache_data(ttl=30)
+def _dashboard_counts():
+    """Metric counts for the Dashboard page, read from the trigger-maintained stats table."""
+    counts = db.get_counts()
+    return counts["memories"], counts["master_actions"], counts["users"]
+
 # Sidebar Navigation
 st.sidebar.title("🤖 Rito AI V2.0")
 page = st.sidebar.radio(
@@ -68,37 +122,30 @@ if alert:
 if page == "📊 Dashboard":
     st.title("📊 System Dashboard")
     
+    if st.button("🔄 Refresh", key="refresh_dashboard_counts"):
+        _dashboard_counts.clear()
+
+    memory_count, action_count, user_count = _dashboard_counts()
+
     col1, col2, col3 = st.columns(3)
-    
+
     with col1:
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM memories")
-            memory_count = cursor.fetchone()[0]
         st.metric("Total Memories", memory_count)
-    
+
     with col2:
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM master_actions")
-            action_count = cursor.fetchone()[0]
         st.metric("Master Actions Logged", action_count)
-    
+
     with col3:
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM users")
-            user_count = cursor.fetchone()[0]
         st.metric("Registered Users", user_count)
-    
+
     st.divider()
     
     st.subheader("Recent Master Actions")
-    with db.get_connection() as conn:
-        df = pd.read_sql_query(
-            "SELECT * FROM master_actions ORDER BY timestamp DESC LIMIT 20",
-            conn
-        )
+    conn = get_conn()
+    df = pd.read_sql_query(
+        "SELECT * FROM master_actions ORDER BY timestamp DESC LIMIT 20",
+        conn
+    )
     if not df.empty:
         df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
         st.dataframe(df, use_container_width=True)
@@ -109,10 +156,7 @@ if page == "📊 Dashboard":
 elif page == "🧠 Persona Editor":
     st.title("🧠 Persona Editor")
     
-    with db.get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM personas")
-        personas = cursor.fetchall()
+    personas = load_personas(db.get_persona_version())
     
     if personas:
         persona_names = [p['name'] for p in personas]
@@ -152,7 +196,7 @@ elif page == "🧠 Persona Editor":
         
         if st.button("💾 Save Changes", key=f"save_{persona['id']}"):
             try:
-                json_data = json.loads(new_metadata)
+                json_data = json_codec.loads(new_metadata)
                 with db.get_connection() as conn:
                     cursor = conn.cursor()
                     if is_active:
@@ -160,12 +204,13 @@ elif page == "🧠 Persona Editor":
                     
                     cursor.execute(
                         "UPDATE personas SET system_prompt = ?, metadata_json = ?, role = ?, active = ? WHERE id = ?",
-                        (new_prompt, json.dumps(json_data, ensure_ascii=False), new_role, int(is_active), persona['id'])
+                        (new_prompt, json_codec.dumps(json_data), new_role, int(is_active), persona['id'])
                     )
                     conn.commit()
+                load_personas.clear()
                 st.success("✅ Character Persona updated successfully!")
                 st.rerun()
-            except json.JSONDecodeError:
+            except json_codec.JSONDecodeError:
                 st.error("❌ Invalid JSON in Character Card!")
 
     else:
@@ -179,51 +224,36 @@ elif page == "📜 History Viewer":
     
     with tab1:
         st.subheader("Memories")
-        with db.get_connection() as conn:
-            df = pd.read_sql_query(
-                "SELECT * FROM memories ORDER BY timestamp DESC LIMIT 100",
-                conn
-            )
-        if not df.empty:
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
-            st.dataframe(df, use_container_width=True)
-        else:
-            st.info("No memories recorded yet.")
+        show_paged(
+            "SELECT id, user_id, substr(content, 1, 200) AS preview, memory_type, sentiment_score, timestamp "
+            "FROM memories ORDER BY timestamp DESC",
+            key="memories",
+            empty_message="No memories recorded yet."
+        )
     
     with tab2:
         st.subheader("Actions Log")
-        with db.get_connection() as conn:
-            df = pd.read_sql_query(
-                "SELECT * FROM actions_log ORDER BY timestamp DESC LIMIT 100",
-                conn
-            )
-        if not df.empty:
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
-            st.dataframe(df, use_container_width=True)
-        else:
-            st.info("No actions logged yet.")
+        show_paged(
+            "SELECT id, action_type, substr(detail, 1, 200) AS detail, substr(reason, 1, 200) AS reason, timestamp "
+            "FROM actions_log ORDER BY timestamp DESC",
+            key="actions_log",
+            empty_message="No actions logged yet."
+        )
     
     with tab3:
         st.subheader("Master Actions")
-        with db.get_connection() as conn:
-            df = pd.read_sql_query(
-                "SELECT * FROM master_actions ORDER BY timestamp DESC LIMIT 100",
-                conn
-            )
-        if not df.empty:
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
-            st.dataframe(df, use_container_width=True)
-        else:
-            st.info("No master actions recorded yet.")
+        show_paged(
+            "SELECT id, activity_type, substr(detail, 1, 200) AS detail, sentiment, timestamp "
+            "FROM master_actions ORDER BY timestamp DESC",
+            key="master_actions",
+            empty_message="No master actions recorded yet."
+        )
 
 # === Relationship Manager ===
 elif page == "👥 Relationship Manager":
     st.title("👥 Relationship Manager")
     
-    with db.get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users")
-        users = cursor.fetchall()
+    users = load_users()
     
     if users:
         for user in users:
@@ -265,6 +295,7 @@ elif page == "👥 Relationship Manager":
                             (new_level, new_type, new_notes, user['id'])
                         )
                         conn.commit()
+                    load_users.clear()
                     st.success(f"✅ Updated {user['username']}")
     else:
         st.info("No users registered yet. Start a conversation first.")
@@ -286,14 +317,12 @@ elif page == "🔗 Identity Management":
         
         with tab1:
             st.subheader("📋 All User Identities")
-            with db.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM users")
-                all_users = cursor.fetchall()
+            all_users = load_users()
             
             if all_users:
+                identities_by_uid = identity_manager.get_identities_for_users([u['id'] for u in all_users])
                 for user in all_users:
-                    identities = identity_manager.get_user_identities(user['id'])
+                    identities = identities_by_uid[user['id']]
                     with st.expander(f"👤 {user['username']} ({len(identities)} identities)"):
                         if identities:
                             for identity in identities:
@@ -317,6 +346,7 @@ elif page == "🔗 Identity Management":
                         with col1:
                             if st.button("✅ Approve", key=f"approve_{request['id']}"):
                                 identity_manager.approve_merge_request(request['id'])
+                                load_users.clear()
                                 st.rerun()
                         with col2:
                             if st.button("❌ Reject", key=f"reject_{request['id']}"):
@@ -356,8 +386,9 @@ elif page == "⚙️ Settings":
             {"key": "autonomous_mode", "label": "🤖 Autonomous Mode", "help": "自律モードを許可するか"}
         ]
 
+        config_values = cfg(tuple(item["key"] for item in config_items), True)
         for item in config_items:
-            current_val = db.get_config(item["key"], True)
+            current_val = config_values[item["key"]]
             col1, col2 = st.columns([1, 2])
             with col1:
                 new_val = st.toggle(item["label"], value=bool(current_val), key=f"toggle_{item['key']}")
@@ -367,33 +398,33 @@ elif page == "⚙️ Settings":
                     reason = st.text_input("変更の理由", key=f"reason_{item['key']}", placeholder="（任意）")
                     if st.button("適用", key=f"apply_{item['key']}"):
                         db.set_config(item["key"], new_val, reason=reason if reason else "No reason provided")
+                        cfg.clear()
                         st.rerun()
 
         st.divider()
         st.subheader("📜 Config Audit Log")
-        with db.get_connection() as conn:
-            audit_df = pd.read_sql_query("SELECT * FROM config_audit_log ORDER BY timestamp DESC LIMIT 50", conn)
-        if not audit_df.empty:
-            st.dataframe(audit_df, use_container_width=True)
+        show_paged(
+            "SELECT timestamp, key, old_value, new_value, reason, changed_by FROM config_audit_log ORDER BY timestamp DESC",
+            key="config_audit_log",
+            empty_message="No config changes recorded yet."
+        )
 
 # === Check Mode ===
 elif page == "🔧 Check Mode":
     st.title("🔧 Check Mode (Maintenance & Testing)")
     
-    is_maint = db.get_config("maintenance_mode", False)
+    is_maint = cfg(("maintenance_mode",), False)["maintenance_mode"]
     if is_maint: st.warning("⚠️ **Maintenance Mode is ON.**")
     else: st.info("💡 Maintenance Mode is OFF.")
 
     st.subheader("🚀 Quick Diagnostics")
-    from src.tests.system_check import run_all_checks
-    
-    # Force reload to get latest check logic
-    import src.tests.system_check
-    importlib.reload(src.tests.system_check)
-    from src.tests.system_check import run_all_checks
+    # Reload only on request to pick up edited check logic
+    if st.button("♻️ Reload checks", key="reload_checks_check_mode"):
+        importlib.reload(system_check)
+        _run_all_checks.clear()
 
     if st.button("🔍 Run Full System Check"):
-        results = run_all_checks()
+        results = _run_all_checks()
         for r in results:
             st.write(f"{'✅' if r['status'] else '❌'} **{r['component']}**: {r['message']}")
 
@@ -422,22 +453,34 @@ elif page == "🔍 Search":
     st.title("🔍 Search")
     search_query = st.text_input("Enter search query")
     if search_query:
-        with db.get_connection() as conn:
-            query = "SELECT * FROM memories WHERE content LIKE ? ORDER BY timestamp DESC LIMIT 50"
-            df = pd.read_sql_query(query, conn, params=(f"%{search_query}%",))
-            st.dataframe(df, use_container_width=True)
+        conn = get_conn()
+        has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'memories_fts'").fetchone() is not None
+        # Trigram index needs at least 3 characters; shorter queries fall back to LIKE
+        if has_fts and len(search_query) >= 3:
+            query = (
+                "SELECT m.id, m.user_id, substr(m.content, 1, 200) AS preview, m.memory_type, m.timestamp "
+                "FROM memories_fts f JOIN memories m ON m.id = f.rowid "
+                "WHERE memories_fts MATCH ? ORDER BY m.timestamp DESC"
+            )
+            params = ('"' + search_query.replace('"', '""') + '"',)
+        else:
+            query = (
+                "SELECT id, user_id, substr(content, 1, 200) AS preview, memory_type, timestamp "
+                "FROM memories WHERE content LIKE ? ORDER BY timestamp DESC"
+            )
+            params = (f"%{search_query}%",)
+        show_paged(query, params, key="search", empty_message="No matching memories.")
 
 # === Diagnostics ===
 elif page == "🔧 Diagnostics":
     st.title("🔧 System Diagnostics")
-    # Import system check module
-    import src.tests.system_check
-    importlib.reload(src.tests.system_check)
-    from src.tests.system_check import run_all_checks
+    if st.button("♻️ Reload checks", key="reload_checks_diagnostics"):
+        importlib.reload(system_check)
+        _run_all_checks.clear()
     
     # Run checks
     if st.button("🔄 Run Diagnostics", type="primary"):
-        results = run_all_checks()
+        results = _run_all_checks()
         for result in results:
             with st.expander(f"{'✅' if result['status'] else '❌'} {result['component']}"):
                 st.write(result['message'])
@@ -1,4 +1,4 @@
-import time
+import asyncio
 import json
 import os
 from typing import Dict, Any, List
@@ -21,23 +21,27 @@ class BlueskyBridge:
         #     self.client = Client()
         #     self.client.login(self.handle, self.password)
 
-    def fetch_notifications(self):
+    async def fetch_notifications(self) -> int:
         """
         Polls for new notifications and adds them to the event queue.
+        Returns the number of notifications queued.
         """
         if not self.client:
             # print("[Bluesky] Client not initialized. Skipping notification check.")
-            return
+            return 0
 
+        count = 0
         try:
-            # Example logic for atproto
-            # response = self.client.app.bsky.notification.list_notifications()
+            # Example logic for atproto (blocking client, so run it off the event loop)
+            # response = await asyncio.to_thread(self.client.app.bsky.notification.list_notifications)
             # for notification in response.notifications:
             #     if not notification.is_read:
-            #         self._process_notification(notification)
+            #         await asyncio.to_thread(self._process_notification, notification)
+            #         count += 1
             pass
         except Exception as e:
             print(f"[Bluesky] Error fetching notifications: {e}")
+        return count
 
     def _process_notification(self, notification):
         """
@@ -62,27 +66,43 @@ class BlueskyBridge:
         # Mark as read in a real implementation
         # self.client.app.bsky.notification.update_seen({"seen_at": ...})
 
-    def run_poll_loop(self, interval: int = 60):
+    async def run(self, interval: int = 60):
+        """
+        Async poll loop. Re-polls after 1s while there is activity and backs off
+        exponentially (up to `interval` seconds) while idle.
+        """
         print("[Bluesky] Starting notification poll loop...")
+        delay = 1
         while True:
-            self.fetch_notifications()
+            got = await self.fetch_notifications()
             # Also check outbox for pending posts
-            self.process_outbox()
-            time.sleep(interval)
+            got += await self.process_outbox()
+            delay = 1 if got else min(interval, delay * 2)
+            await asyncio.sleep(delay)
+
+    def run_poll_loop(self, interval: int = 60):
+        """Standalone entry point when not sharing the Discord bot's event loop."""
+        asyncio.run(self.run(interval))
 
-    def process_outbox(self):
+    async def process_outbox(self) -> int:
         """
         Checks for outgoing posts in the message_outbox.
+        Returns the number of messages sent.
         """
-        messages = self.db.get_pending_outbox("bluesky")
+        # Claimed atomically: the bridge may run inside the Discord bot and standalone at the same time
+        messages = await asyncio.to_thread(self.db.claim_pending_outbox, "bluesky")
+        sent = 0
         for msg in messages:
             try:
                 print(f"[Bluesky] Sending {msg['message_type']}: {msg['content']}")
                 # if msg['message_type'] == 'post':
-                #     self.client.send_post(msg['content'])
-                self.db.mark_outbox_sent(msg['id'])
+                #     await asyncio.to_thread(self.client.send_post, msg['content'])
+                await asyncio.to_thread(self.db.mark_outbox_sent, msg['id'])
+                sent += 1
             except Exception as e:
                 print(f"[Bluesky] Failed to send to Bluesky: {e}")
+                await asyncio.to_thread(self.db.release_outbox, msg['id'])
+        return sent
 
 if __name__ == "__main__":
     from src.core.database import DatabaseManager
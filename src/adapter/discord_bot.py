@@ -1,9 +1,11 @@
 import discord
 from discord.ext import commands, tasks
-import json
 import asyncio
-from typing import Optional
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 from src.core.database import DatabaseManager
+from src.core import json_codec
 from src.llm.client import LLMClient
 from src.controller.policy import Controller
 from src.adapter.interface import SNSAdapter, AnalysisAdapter
@@ -13,7 +15,13 @@ class DiscordBot:
     Discord Bot integration for Rito AI.
     Handles multi-user conversations with relationship tracking.
     """
-    def __init__(self, token: str, db_manager: DatabaseManager, llm_client: LLMClient):
+    USER_CACHE_SIZE = 1024
+    # Cached user rows are re-read after this long, so dashboard edits (type, notes) show up
+    USER_CACHE_TTL = 30.0  # seconds
+    OUTBOX_CONCURRENCY = 10
+    CONTEXT_TTL = 5.0  # seconds
+
+    def __init__(self, token: str, db_manager: DatabaseManager, llm_client: LLMClient, bluesky_bridge=None):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
@@ -23,12 +31,30 @@ class DiscordBot:
         self.db = db_manager
         self.llm = llm_client
         self.controller = Controller()
+        # Optional BlueskyBridge polled on this bot's event loop
+        self.bluesky = bluesky_bridge
+        self._bluesky_task = None
+
+        # LRU cache of discord_id -> (loaded_at, user row), plus user_id -> discord_id for updates
+        self._user_cache: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._user_cache_ids: dict = {}
+
+        # (persona_version, active communication persona)
+        self._persona_cache: Tuple[int, Optional[dict]] = (-1, None)
+
+        # user_id -> (built_at, context string) for bursts of messages from the same user
+        self._ctx_cache: Dict[int, Tuple[float, str]] = {}
+
+        # Caps concurrent outbox sends to stay within Discord rate limits
+        self._send_semaphore = asyncio.Semaphore(self.OUTBOX_CONCURRENCY)
         
         # Register events
         @self.bot.event
         async def on_ready():
             print(f"[Discord] Bot logged in as {self.bot.user}")
             self.check_outbox.start()
+            if self.bluesky and self._bluesky_task is None:
+                self._bluesky_task = self.bot.loop.create_task(self.bluesky.run())
         
         @self.bot.event
         async def on_message(message):
@@ -38,23 +64,27 @@ class DiscordBot:
             
             # Check if DM
             is_dm = isinstance(message.channel, discord.DMChannel)
+
+            # Ordinary channel chatter is ignored before any DB or LLM work
+            if not (is_dm or self.bot.user.mentioned_in(message)):
+                return
             
             # Queue important events into pending_events for the Router
             # For now, we still handle message replies directly as before, 
             # but we can also queue them if we want the Router to decide.
             # But DMs and Mentions should definitely be events.
-            if is_dm or self.bot.user.mentioned_in(message):
-                self.db.add_pending_event(
-                    source_type="dm" if is_dm else "mention",
-                    payload={
-                        "user_id": str(message.author.id),
-                        "username": message.author.name,
-                        "content": message.content,
-                        "channel_id": str(message.channel.id),
-                        "platform": "discord"
-                    },
-                    priority=2
-                )
+            # (queued: committed by the DB's background writer, so the event loop never waits on SQLite)
+            self.db.add_pending_event(
+                source_type="dm" if is_dm else "mention",
+                payload={
+                    "user_id": str(message.author.id),
+                    "username": message.author.name,
+                    "content": message.content,
+                    "channel_id": str(message.channel.id),
+                    "platform": "discord"
+                },
+                priority=2
+            )
             
             # Standard automated reply (Communication role)
             await self.handle_message(message)
@@ -78,6 +108,11 @@ class DiscordBot:
         Retrieves or creates a user record based on Discord ID.
         """
         discord_id = str(discord_user.id)
+
+        cached = self._user_cache.get(discord_id)
+        if cached is not None and time.time() - cached[0] < self.USER_CACHE_TTL:
+            self._user_cache.move_to_end(discord_id)
+            return dict(cached[1])
         
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
@@ -96,7 +131,15 @@ class DiscordBot:
                 user = cursor.fetchone()
                 print(f"[Discord] New user registered: {discord_user.name}")
             
-            return dict(user)
+            user = dict(user)
+
+        self._user_cache[discord_id] = (time.time(), user)
+        self._user_cache.move_to_end(discord_id)
+        self._user_cache_ids[user['id']] = discord_id
+        if len(self._user_cache) > self.USER_CACHE_SIZE:
+            _, (_, evicted) = self._user_cache.popitem(last=False)
+            self._user_cache_ids.pop(evicted['id'], None)
+        return dict(user)
     
     def update_relationship(self, user_id: int, delta: int, new_notes: Optional[str] = None):
         """
@@ -104,36 +147,67 @@ class DiscordBot:
         """
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE users SET relationship_level = relationship_level + ? WHERE id = ?",
-                (delta, user_id)
-            )
             if new_notes:
                 cursor.execute(
-                    "UPDATE users SET notes = ? WHERE id = ?",
-                    (new_notes, user_id)
+                    "UPDATE users SET relationship_level = relationship_level + ?, notes = ? WHERE id = ?",
+                    (delta, new_notes, user_id)
+                )
+            else:
+                cursor.execute(
+                    "UPDATE users SET relationship_level = relationship_level + ? WHERE id = ?",
+                    (delta, user_id)
                 )
             conn.commit()
+
+        # Keep the cached row current instead of evicting it, so the next message still hits the cache
+        cached = self._user_cache.get(self._user_cache_ids.get(user_id))
+        if cached is not None:
+            user = cached[1]
+            user['relationship_level'] = (user['relationship_level'] or 0) + delta
+            if new_notes:
+                user['notes'] = new_notes
     
-    async def handle_message(self, message: discord.Message):
+    def get_user_context(self, user_id: int) -> str:
         """
-        Handles incoming Discord messages.
+        Returns the last 10 memories of a user as one string, cached for CONTEXT_TTL seconds.
         """
-        user = self.get_or_create_user(message.author)
-        
-        # Build context from user history
+        cached = self._ctx_cache.get(user_id)
+        if cached and time.time() - cached[0] < self.CONTEXT_TTL:
+            return cached[1]
+
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                "SELECT content FROM memories WHERE user_id = ? ORDER BY timestamp DESC LIMIT 10",
-                (user['id'],)
+                """SELECT GROUP_CONCAT(content, char(10)) AS ctx FROM (
+                       SELECT content FROM memories WHERE user_id = ? ORDER BY timestamp DESC LIMIT 10
+                   )""",
+                (user_id,)
             )
-            past_memories = cursor.fetchall()
+            row = cursor.fetchone()
+
+        context = row['ctx'] if row and row['ctx'] else "初対面です。"
+        self._ctx_cache[user_id] = (time.time(), context)
+        return context
+
+    def get_communication_persona(self) -> Optional[dict]:
+        """
+        Returns the active communication persona, re-reading it only when the persona version changes.
+        """
+        version = self.db.get_persona_version()
+        if version != self._persona_cache[0]:
+            self._persona_cache = (version, self.db.get_active_persona(role="communication"))
+        return self._persona_cache[1]
+
+    async def handle_message(self, message: discord.Message):
+        """
+        Handles incoming Discord messages.
+        """
+        user = self.get_or_create_user(message.author)
         
-        context = "\n".join([m['content'] for m in past_memories]) if past_memories else "初対面です。"
+        context = self.get_user_context(user['id'])
         
         # Get Active Persona (Communication)
-        active_persona = self.db.get_active_persona(role="communication")
+        active_persona = self.get_communication_persona()
         system_prompt = active_persona["system_prompt"] if active_persona else "あなたは生意気なAIリトだ。"
         
         # Create prompt
@@ -154,8 +228,8 @@ class DiscordBot:
         
         try:
             # Generate response
-            response_json = self.llm.generate(prompt, system_prompt=system_prompt, format="json")
-            response_data = json.loads(response_json)
+            response_json = await self.llm.agenerate(prompt, system_prompt=system_prompt, format="json")
+            response_data = json_codec.loads(response_json)
             
             response_text = response_data.get("response", "...")
             relationship_delta = response_data.get("relationship_delta", 0)
@@ -165,13 +239,15 @@ class DiscordBot:
             
             # Update relationship
             self.update_relationship(user['id'], relationship_delta)
+            # This exchange becomes part of the user's history, so rebuild context next time
+            self._ctx_cache.pop(user['id'], None)
             
             # Save memory
-            self.db.add_memory(
+            self.db.add_chat_memory(
                 user_id=user['id'],
                 content=f"User: {message.content}\nAI: {response_text}",
-                emotion_tags="neutral",
-                sentiment_score=0.0
+                emotions=["neutral"],
+                sentiment=0.0
             )
             
             print(f"[Discord] Responded to {message.author.name}: {response_text[:50]}...")
@@ -194,6 +270,20 @@ class DiscordBot:
             print(f"[Discord] Failed to send DM to {user_id}: {e}")
         return False
 
+    async def _try_send(self, msg: dict) -> bool:
+        """
+        Sends one outbox message, limited by the send semaphore.
+        """
+        async with self._send_semaphore:
+            if msg['message_type'] == 'dm':
+                return await self.send_direct_message(msg['target_id'], msg['content'])
+            elif msg['message_type'] == 'post':
+                # For now, posts go to a default channel if target_id is 'public'
+                # Or we find the last channel interacted with
+                # Or we just use a 'news' channel
+                pass
+        return False
+
     @tasks.loop(seconds=10)
     async def check_outbox(self):
         """
@@ -201,18 +291,11 @@ class DiscordBot:
         """
         try:
             messages = self.db.get_pending_outbox("discord")
-            for msg in messages:
-                success = False
-                if msg['message_type'] == 'dm':
-                    success = await self.send_direct_message(msg['target_id'], msg['content'])
-                elif msg['message_type'] == 'post':
-                    # For now, posts go to a default channel if target_id is 'public'
-                    # Or we find the last channel interacted with
-                    # Or we just use a 'news' channel
-                    pass
-                
-                if success:
-                    self.db.mark_outbox_sent(msg['id'])
+            if not messages:
+                return
+            results = await asyncio.gather(*[self._try_send(msg) for msg in messages])
+            sent_ids = [msg['id'] for msg, ok in zip(messages, results) if ok]
+            self.db.mark_outbox_sent_many(sent_ids)
         except Exception as e:
             print(f"[Discord] Error in check_outbox: {e}")
 
@@ -221,7 +304,11 @@ class DiscordBot:
         Starts the Discord bot.
         """
         print("[Discord] Starting bot...")
-        self.bot.run(self.token)
+        try:
+            self.bot.run(self.token)
+        finally:
+            # Commit events and outbox updates still sitting in the DB's write queue
+            self.db.flush()
 
 if __name__ == "__main__":
     import os
@@ -234,8 +321,10 @@ if __name__ == "__main__":
         print("[Discord] Error: DISCORD_BOT_TOKEN not found in .env")
         exit(1)
     
+    from src.adapter.bluesky_bridge import BlueskyBridge
+
     db = DatabaseManager()
     llm = LLMClient()
     
-    bot = DiscordBot(token, db, llm)
+    bot = DiscordBot(token, db, llm, bluesky_bridge=BlueskyBridge(db))
     bot.run()
@@ -1,62 +1,199 @@
+import asyncio
+import collections
+import functools
 import subprocess
 import json
+import re
+import shutil
 import tempfile
 import os
+import sys
 from typing import Dict, Any, Optional
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Linux ioctl that clones a file's extents copy-on-write (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+
+# Skipped when copying a non-git workspace for Goose
+COPY_IGNORE_PATTERNS = (
+    '.git', '__pycache__', 'venv', '.venv', '.env', 'brain.db',
+    'node_modules', '.mypy_cache', '.pytest_cache', '*.pyc',
+)
+
+# Goose output containing any of these is treated as a y/n prompt
+PROMPT_TRIGGERS = ("(y/n)", "[y/n]", "sure?", "proceed?", "allow?", "overwrite?")
+
+def _make_copy_function():
+    """
+    copytree copy_function that tries a reflink (FICLONE) clone first on Linux,
+    so supporting filesystems copy in O(1) per file. After the first failure
+    (unsupported FS, cross-device) it sticks to shutil.copy2 for the rest of the tree.
+    """
+    reflink_ok = fcntl is not None and sys.platform.startswith("linux")
+
+    def copy(src, dst, *, follow_symlinks=True):
+        nonlocal reflink_ok
+        if reflink_ok:
+            try:
+                with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                shutil.copystat(src, dst, follow_symlinks=follow_symlinks)
+                return dst
+            except OSError:
+                reflink_ok = False
+        return shutil.copy2(src, dst, follow_symlinks=follow_symlinks)
+
+    return copy
+
+@functools.lru_cache(maxsize=1)
+def _find_goose_binary() -> Optional[str]:
+    """Search for Goose binary in PATH and common locations (cached for the process lifetime)"""
+    # 1. Check in PATH (pure lookup, no process spawn; honours PATHEXT on Windows)
+    exe = shutil.which("goose") or shutil.which("goose.exe")
+    if exe:
+        return exe
+
+    # 2. Check common pipx locations on Windows.
+    # Existence + executable is enough; a broken binary surfaces on the first real run.
+    paths = [
+        os.path.join(os.environ.get("LOCALAPPDATA", ""), "pipx", "bin", "goose.exe"),
+        os.path.join(os.path.expanduser("~"), ".local", "bin", "goose.exe"),
+        os.path.join(os.path.expanduser("~"), "AppData", "Local", "bin", "goose.exe")
+    ]
+    for p in paths:
+        if os.path.isfile(p) and os.access(p, os.X_OK):
+            return p
+    return None
+
+class _OutputLog:
+    """
+    Sink for Goose output lines: the full text is spooled to a temp file
+    (kept in memory up to 1 MB) and only the recent tail is held as a list of lines.
+    """
+    def __init__(self, tail_lines: int = 200):
+        self._file = tempfile.SpooledTemporaryFile(max_size=1 << 20, mode="w+", encoding="utf-8")
+        self._tail = collections.deque(maxlen=tail_lines)
+
+    def append(self, line: str):
+        self._file.write(line)
+        self._tail.append(line)
+
+    def tail(self, n: int) -> str:
+        return "".join(list(self._tail)[-n:])
+
+    def getvalue(self) -> str:
+        self._file.seek(0)
+        return self._file.read()
+
 class GooseAdapter:
     """
     Adapter for Square's Goose AI coding assistant.
     Executes Goose via subprocess for coding tasks only.
     """
+    # Prompt patterns that get an automatic 'y' (one case-insensitive scan per line)
+    _PROMPT_RE = re.compile("(?i)" + "|".join(map(re.escape, PROMPT_TRIGGERS)))
+
     def __init__(self, db_manager=None):
         self.db = db_manager
-        self.goose_exe = self._binary_search()
+        self.goose_exe = _find_goose_binary()
         self.goose_available = self.goose_exe is not None
         if not self.goose_available:
             print("[Goose] Warning: Goose CLI not found. Install via: pipx install goose-ai")
             if self.db:
                 self.db.set_system_alert("Goose CLI not found in PATH or standard locations.", level="error")
     
-    def _binary_search(self) -> Optional[str]:
-        """Search for Goose binary in PATH and common locations"""
-        # 1. Check in PATH
-        try:
+    def _is_clean_git_repo(self, path: str) -> bool:
+        """True if path is a git work tree with no uncommitted or untracked changes"""
+        if not os.path.isdir(os.path.join(path, ".git")):
+            return False
+        result = subprocess.run(["git", "status", "--porcelain"], cwd=path, capture_output=True, text=True)
+        return result.returncode == 0 and not result.stdout.strip()
+
+    def _prepare_workspace(self, main_workspace: str, temp_dir: str) -> str:
+        """
+        Populate temp_dir with a copy of main_workspace and return the baseline
+        (commit or tree id) that the proposal diff is taken against.
+        A clean git repo is cloned with shared objects (no copying or re-hashing of blobs);
+        anything else is copied and staged into a fresh repo.
+        """
+        if self._is_clean_git_repo(main_workspace):
             result = subprocess.run(
-                ["goose", "--version"],
-                capture_output=True,
-                text=True,
-                timeout=5,
-                shell=True
+                ["git", "clone", "--local", "--shared", "--quiet", main_workspace, temp_dir],
+                capture_output=True
             )
             if result.returncode == 0:
-                return "goose"
-        except Exception:
-            pass
+                return "HEAD"
+            print(f"[Goose] git clone failed, falling back to copy: {result.stderr.decode(errors='replace').strip()}")
+
+        # Only copy source files to avoid bloat (ignore .git, caches, build output, binaries, etc)
+        ignore_patterns = shutil.ignore_patterns(*COPY_IGNORE_PATTERNS)
+        shutil.copytree(main_workspace, temp_dir, dirs_exist_ok=True, ignore=ignore_patterns,
+                        copy_function=_make_copy_function())
+        
+        # Initialize temporary git repo in temp_dir to capture diffs.
+        # The baseline is just the staged tree: no commit (and no user identity) needed.
+        subprocess.run(["git", "init", "-q"], cwd=temp_dir, capture_output=True)
+        subprocess.run(["git", "add", "-A"], cwd=temp_dir, capture_output=True)
+        result = subprocess.run(["git", "write-tree"], cwd=temp_dir, capture_output=True, text=True)
+        return result.stdout.strip()
+
+    async def _handle_line(self, proc, line: str, name: str, all_output: "_OutputLog"):
+        """Log one line of Goose output and auto-answer y/n prompts"""
+        clean_line = line.strip()
+        if clean_line:
+            print(f"[Goose {name}] {clean_line}")
+            all_output.append(line)
             
-        # 2. Check common pipx locations on Windows
-        paths = [
-            os.path.join(os.environ.get("LOCALAPPDATA", ""), "pipx", "bin", "goose.exe"),
-            os.path.join(os.path.expanduser("~"), ".local", "bin", "goose.exe"),
-            os.path.join(os.path.expanduser("~"), "AppData", "Local", "bin", "goose.exe")
-        ]
-        for p in paths:
-            if os.path.exists(p):
+            # Resilience: Automatic y/n response
+            if self._PROMPT_RE.search(clean_line):
+                print(f"[Goose] Detected prompt! Auto-answering 'y'...")
                 try:
-                    result = subprocess.run([p, "--version"], capture_output=True, timeout=5)
-                    if result.returncode == 0:
-                        return p
-                except Exception:
-                    continue
-        return None
-    
+                    proc.stdin.write(b"y\n")
+                    await proc.stdin.drain()
+                except Exception as e:
+                    print(f"[Goose] Failed to write to stdin: {e}")
+
+    async def _pump(self, proc, stream, name: str, all_output: "_OutputLog"):
+        """
+        Read one output stream until EOF.
+        A trailing partial line is also checked, since prompts usually wait without a newline.
+        """
+        buf = bytearray()
+        while True:
+            chunk = await stream.read(4096)
+            if not chunk:
+                if buf:
+                    await self._handle_line(proc, buf.decode("utf-8", errors="replace"), name, all_output)
+                return
+            buf.extend(chunk)
+            while (newline := buf.find(b"\n")) >= 0:
+                line = buf[:newline + 1].decode("utf-8", errors="replace")
+                del buf[:newline + 1]
+                await self._handle_line(proc, line, name, all_output)
+            if buf.rstrip().endswith((b"?", b")", b"]")):
+                # Looks like a prompt waiting for input
+                await self._handle_line(proc, buf.decode("utf-8", errors="replace"), name, all_output)
+                buf.clear()
+
     def execute(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Blocking wrapper around execute_async for synchronous callers.
+        From inside a running event loop, await execute_async instead.
+        """
+        return asyncio.run(self.execute_async(params))
+
+    async def execute_async(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
         Execute a coding task via Goose and generate a proposal (diff).
         
         This implementation clones the current workspace to a temporary directory,
         allows Goose to perform work there, and then returns the diff of changes.
+        The event loop stays free while Goose runs.
         """
         if not self.goose_available:
             return {
@@ -73,120 +210,88 @@ class GooseAdapter:
         # 1. Create a temporary workspace for Goose to 'play' in
         with tempfile.TemporaryDirectory() as temp_dir:
             print(f"[Goose] Cloning workspace to {temp_dir} for proposal...")
-            # Use git clone or simple copy if not a git repo
-            # Simple recursive copy for now for reliability
-            import shutil
-            # Only copy source files to avoid bloat (ignore .git, __pycache__, etc)
-            ignore_patterns = shutil.ignore_patterns('.git', '__pycache__', 'venv', '.env', 'brain.db')
-            shutil.copytree(main_workspace, temp_dir, dirs_exist_ok=True, ignore=ignore_patterns)
-            
-            # Initialize temporary git repo in temp_dir to capture diffs
-            subprocess.run(["git", "init"], cwd=temp_dir, capture_output=True)
-            subprocess.run(["git", "add", "."], cwd=temp_dir, capture_output=True)
-            subprocess.run(["git", "commit", "-m", "baseline"], cwd=temp_dir, capture_output=True)
-
-        # 2. Execute Goose in the temp workspace
-        try:
-            # Create a temporary instruction file
-            instruction_file = os.path.join(temp_dir, "instructions.txt")
-            with open(instruction_file, "w", encoding="utf-8") as f:
-                f.write(task)
+            baseline = await asyncio.to_thread(self._prepare_workspace, main_workspace, temp_dir)
+
+            # 2. Execute Goose in the temp workspace
+            try:
+                # Create a temporary instruction file (excluded from the proposal diff)
+                exclude_dir = os.path.join(temp_dir, ".git", "info")
+                os.makedirs(exclude_dir, exist_ok=True)
+                with open(os.path.join(exclude_dir, "exclude"), "a", encoding="utf-8") as f:
+                    f.write("\n/instructions.txt\n")
+                instruction_file = os.path.join(temp_dir, "instructions.txt")
+                with open(instruction_file, "w", encoding="utf-8") as f:
+                    f.write(task)
             
-            cmd = [self.goose_exe, "run", "--instructions", "instructions.txt"]
-            print(f"[Goose] Generating proposal for task in {temp_dir}...")
+                cmd = [self.goose_exe, "run", "--instructions", "instructions.txt"]
+                print(f"[Goose] Generating proposal for task in {temp_dir}...")
             
-            import threading
-            import time
-
-            # Start process with popen to allow interactive response & monitoring
-            process = subprocess.Popen(
-                cmd,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=temp_dir,
-                encoding='utf-8',
-                errors='replace',
-                bufsize=1
-                # shell=True # Should not be needed if using full path
-            )
+                # Pipes on all three streams to allow interactive response & monitoring
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=temp_dir
+                )
 
-            all_output = []
-            
-            def monitor_stream(stream, name):
-                try:
-                    for line in iter(stream.readline, ''):
-                        if not line: break
-                        clean_line = line.strip()
-                        if clean_line:
-                            print(f"[Goose {name}] {clean_line}")
-                            all_output.append(line)
-                            
-                            # Resilience: Automatic y/n response
-                            # Detecting various prompt patterns
-                            prompt_triggers = ["(y/n)", "[y/n]", "sure?", "proceed?", "allow?", "overwrite?"]
-                            if any(trigger in clean_line.lower() for trigger in prompt_triggers):
-                                print(f"[Goose] Detected prompt! Auto-answering 'y'...")
-                                try:
-                                    process.stdin.write("y\n")
-                                    process.stdin.flush()
-                                except Exception as e:
-                                    print(f"[Goose] Failed to write to stdin: {e}")
-                except Exception as e:
-                    print(f"[Goose] Stream monitor error: {e}")
+                all_output = _OutputLog()
 
-            stdout_thread = threading.Thread(target=monitor_stream, args=(process.stdout, "OUT"), daemon=True)
-            stderr_thread = threading.Thread(target=monitor_stream, args=(process.stderr, "ERR"), daemon=True)
-            
-            stdout_thread.start()
-            stderr_thread.start()
-            
-            try:
-                # Wait with timeout (5 minutes)
-                rc = process.wait(timeout=300)
-            except subprocess.TimeoutExpired:
-                print("[Goose] Timeout reached! Sending alert...")
-                if self.db:
-                    self.db.set_system_alert("Goose process timed out during code generation. Manual check recommended.", level="error")
-                process.kill()
-                return {"status": "timeout", "error": "Goose timed out (300s)."}
+                async def run_to_exit():
+                    await asyncio.gather(
+                        self._pump(proc, proc.stdout, "OUT", all_output),
+                        self._pump(proc, proc.stderr, "ERR", all_output)
+                    )
+                    return await proc.wait()
             
-            stdout_thread.join(timeout=5)
-            stderr_thread.join(timeout=5)
+                try:
+                    # Wait with timeout (5 minutes)
+                    rc = await asyncio.wait_for(run_to_exit(), 300)
+                except asyncio.TimeoutError:
+                    print("[Goose] Timeout reached! Sending alert...")
+                    if self.db:
+                        self.db.set_system_alert("Goose process timed out during code generation. Manual check recommended.", level="error")
+                    proc.kill()
+                    await proc.wait()
+                    return {"status": "timeout", "error": "Goose timed out (300s)."}
             
-            if rc != 0:
-                last_logs = "".join(all_output[-15:])
-                if self.db:
-                    self.db.set_system_alert(f"Goose failed (RC {rc}). Task might be incomplete.", level="error")
-                return {"status": "failed", "error": f"Goose failed (RC {rc}).\nLast logs:\n{last_logs}"}
+                if rc != 0:
+                    last_logs = all_output.tail(15)
+                    if self.db:
+                        self.db.set_system_alert(f"Goose failed (RC {rc}). Task might be incomplete.", level="error")
+                    return {"status": "failed", "error": f"Goose failed (RC {rc}).\nLast logs:\n{last_logs}"}
             
-            # 3. Capture the diff as the 'Proposal'
-            diff_res = subprocess.run(
-                ["git", "diff", "HEAD"],
-                capture_output=True,
-                text=True,
-                cwd=temp_dir
-            )
+                # 3. Capture the diff as the 'Proposal'
+                proposal_diff = await asyncio.to_thread(self._collect_diff, temp_dir, baseline)
             
-            proposal_diff = diff_res.stdout
+                if not proposal_diff:
+                    return {
+                        "status": "success",
+                        "output": "No changes were proposed.",
+                        "proposal": None
+                    }
             
-            if not proposal_diff:
                 return {
                     "status": "success",
-                    "output": "No changes were proposed.",
-                    "proposal": None
+                    "output": all_output.getvalue(),
+                    "proposal": proposal_diff,
+                    "rationale": "Generated via Goose technical analysis with automatic resilience handling."
                 }
-            
-            return {
-                "status": "success",
-                "output": "".join(all_output),
-                "proposal": proposal_diff,
-                "rationale": "Generated via Goose technical analysis with automatic resilience handling."
-            }
                 
-        except Exception as e:
-            return {"status": "error", "error": str(e)}
+            except Exception as e:
+                return {"status": "error", "error": str(e)}
+
+    def _collect_diff(self, temp_dir: str, baseline: str) -> str:
+        """Diff of everything Goose changed in temp_dir against the baseline"""
+        # Staging picks up new files too; unchanged blobs are reused, not re-hashed
+        subprocess.run(["git", "add", "-A"], cwd=temp_dir, capture_output=True)
+        diff_res = subprocess.run(
+            ["git", "diff", "--cached", baseline],
+            capture_output=True,
+            text=True,
+            cwd=temp_dir
+        )
+        return diff_res.stdout
     
     def execute_simple(self, task: str, workspace: Optional[str] = None) -> str:
         """
@@ -1,6 +1,9 @@
+import asyncio
+import time
 from abc import ABC, abstractmethod
 from typing import Any, Dict
 from src.core.database import DatabaseManager
+from src.core import json_codec
 from src.core.memory import LogRetriever
 from src.core.analysis import UserAnalyzer
 
@@ -15,6 +18,13 @@ class ToolAdapter(ABC):
         """
         pass
 
+    async def execute_async(self, params: Dict[str, Any]) -> Any:
+        """
+        execute() in a worker thread, so the caller's event loop keeps running during blocking IO.
+        Adapters with native async IO can override this.
+        """
+        return await asyncio.to_thread(self.execute, params)
+
     def check_status(self, config_key: str, db: DatabaseManager) -> bool:
         """Checks if the tool is globally enabled."""
         status = db.get_config(config_key, True)
@@ -25,12 +35,24 @@ class ToolAdapter(ABC):
 
 
 class SNSAdapter(ToolAdapter):
+    # Seconds a maintenance_mode lookup is reused; toggles are rare, posts can be bursty
+    MAINTENANCE_TTL = 1.0
+
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
+        self._maint_cache = (0.0, False)
+
+    def _is_maintenance(self) -> Any:
+        now = time.monotonic()
+        ts, val = self._maint_cache
+        if now - ts > self.MAINTENANCE_TTL:
+            val = self.db.get_config("maintenance_mode", False)
+            self._maint_cache = (now, val)
+        return val
 
     def execute(self, params: Dict[str, Any]) -> Any:
         # Check maintenance mode
-        is_maint = self.db.get_config("maintenance_mode", False)
+        is_maint = self._is_maintenance()
         
         action = params.get("action", "post")
         platform = params.get("platform", "discord")
@@ -95,16 +117,26 @@ class AnalysisAdapter(ToolAdapter):
             # Fetch all user identities for collation
             with self.log_retriever.db.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT * FROM user_identities")
-                identities = [dict(row) for row in cursor.fetchall()]
-                cursor.execute("SELECT id, username FROM users")
-                users = [dict(row) for row in cursor.fetchall()]
+                # One round-trip for both lists, partitioned by kind below
+                cursor.execute("""
+                    SELECT 'i' AS kind, id, user_id, platform, platform_id, display_name, verified, linked_at, NULL AS username
+                    FROM user_identities
+                    UNION ALL
+                    SELECT 'u', id, NULL, NULL, NULL, NULL, NULL, NULL, username
+                    FROM users
+                """)
+                rows = cursor.fetchall()
+            identities = [
+                {k: row[k] for k in ("id", "user_id", "platform", "platform_id", "display_name", "verified", "linked_at")}
+                for row in rows if row['kind'] == 'i'
+            ]
+            users = [{"id": row['id'], "username": row['username']} for row in rows if row['kind'] == 'u']
             
             prompt = f"""以下のユーザーリストと、各プラットフォームのアイデンティティ（アカウント）リストを照合してください。
 同一人物である可能性が高い組み合わせを見つけ出し、マージ（統合）を提案してください。
 
-ユーザーリスト: {json.dumps(users, ensure_ascii=False)}
-アイデンティティリスト: {json.dumps(identities, ensure_ascii=False)}
+ユーザーリスト: {json_codec.dumps(users)}
+アイデンティティリスト: {json_codec.dumps(identities)}
 
 JSON形式で返答してください:
 {{
@@ -118,7 +150,7 @@ JSON形式で返答してください:
             
             try:
                 response = self.user_analyzer.llm.generate(prompt, system_prompt=system_prompt, format="json")
-                return {"status": "completed", "identity_analysis": json.loads(response)}
+                return {"status": "completed", "identity_analysis": json_codec.loads(response)}
             except Exception as e:
                 return {"error": f"Identity matching failed: {str(e)}"}
             
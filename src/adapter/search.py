@@ -1,6 +1,9 @@
 import requests
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from src.core import json_codec
 
 class SearchAdapter:
     """
@@ -8,12 +11,29 @@ class SearchAdapter:
     1. Ollama native web_search (primary, requires newer Ollama)
     2. DuckDuckGo search (fallback, always available)
     """
+    # How long a remembered web_search capability result stays valid
+    CAPABILITY_TTL = 600  # seconds
+    # DuckDuckGo is only queried when Ollama fails, or in parallel once Ollama takes longer than this
+    DDG_HEDGE_DELAY = 3.0  # seconds
+
     def __init__(self, ollama_url: Optional[str] = None):
         self.ollama_url = ollama_url or os.getenv("OLLAMA_URL", "http://localhost:11434")
         self.use_ollama_search = True  # Try Ollama first
+        # (ollama_url, model) -> (checked_at, supported)
+        self._ollama_ws_supported: Dict[tuple, tuple] = {}
+
+        # Keep-alive session so repeated Ollama calls reuse the TCP connection
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Connection"] = "keep-alive"
         
         # Lazy import for fallback
         self.ddg = None
+
+        # Runs the DuckDuckGo fallback concurrently with the Ollama attempt
+        self._executor = ThreadPoolExecutor(max_workers=2)
     
     def _init_ddg(self):
         """Lazy initialize DuckDuckGo search"""
@@ -25,32 +45,71 @@ class SearchAdapter:
             except ImportError:
                 print("[Search] Warning: duckduckgo-search not installed. Run: pip install duckduckgo-search")
     
-    def search_with_ollama(self, query: str, model: str = "qwen2.5:7b") -> Optional[str]:
+    def _generate_stream(self, payload: Dict[str, Any], timeout: float = 30,
+                         on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        Call Ollama /api/generate with streaming and accumulate the NDJSON chunks.
+        `timeout` bounds the wait for each chunk (so also the first token) and the whole call.
+        Returns None on a non-200 response; raises TimeoutError when the overall deadline
+        cuts the answer short, so a partial answer is never mistaken for a full one.
+        """
+        deadline = time.monotonic() + timeout
+        parts = []
+        with self.session.post(
+            f"{self.ollama_url}/api/generate",
+            json={**payload, "stream": True},
+            timeout=timeout,
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                print(f"[Search] Ollama request failed: {response.status_code}")
+                return None
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json_codec.loads(line)
+                token = chunk.get("response", "")
+                if token:
+                    parts.append(token)
+                    if on_token:
+                        on_token(token)
+                if chunk.get("done"):
+                    break
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Ollama stream exceeded {timeout}s")
+        return "".join(parts)
+
+    def search_with_ollama(self, query: str, model: str = "qwen2.5:7b",
+                           on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
         """
         Search using Ollama's native web_search capability.
         Returns None if not supported or on error.
         """
+        key = (self.ollama_url, model)
+        cached = self._ollama_ws_supported.get(key)
+        if cached and not cached[1] and time.monotonic() - cached[0] < self.CAPABILITY_TTL:
+            return None
+
         try:
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={
+            result = self._generate_stream(
+                {
                     "model": model,
                     "prompt": f"Search the web and answer: {query}",
-                    "web_search": True,  # Enable native web search
-                    "stream": False
+                    "web_search": True  # Enable native web search
                 },
-                timeout=30
+                timeout=30,
+                on_token=on_token
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "")
-            else:
-                print(f"[Search] Ollama web search failed: {response.status_code}")
-                return None
-                
+            self._ollama_ws_supported[key] = (time.monotonic(), result is not None)
+            return result
+
+        except (TimeoutError, requests.Timeout) as e:
+            # Too slow says nothing about web_search support: leave the capability cache alone
+            print(f"[Search] Ollama web search timed out: {e}")
+            return None
         except Exception as e:
             print(f"[Search] Ollama web search error: {e}")
+            self._ollama_ws_supported[key] = (time.monotonic(), False)
             return None
     
     def search_with_duckduckgo(self, query: str, max_results: int = 5) -> List[Dict[str, str]]:
@@ -85,6 +144,7 @@ class SearchAdapter:
             - query: str - Search query
             - max_results: int - Maximum results (for DDG fallback, default: 5)
             - use_llm: bool - If True, use Ollama to summarize results (default: True)
+            - on_token: callable - Optional callback receiving streamed LLM tokens
         
         Returns:
             - results: list or str - Search results
@@ -101,17 +161,28 @@ class SearchAdapter:
         
         # Strategy 1: Try Ollama native web search
         if self.use_ollama_search and use_llm:
-            ollama_result = self.search_with_ollama(query)
+            ollama_future = self._executor.submit(self.search_with_ollama, query, on_token=params.get("on_token"))
+            try:
+                ollama_result = ollama_future.result(timeout=self.DDG_HEDGE_DELAY)
+                ddg_future = None
+            except FutureTimeout:
+                # Ollama is slow: start the DuckDuckGo fallback alongside it, so a failure adds no extra wait
+                ddg_future = self._executor.submit(self.search_with_duckduckgo, query, max_results)
+                ollama_result = ollama_future.result()
             if ollama_result:
+                if ddg_future is not None:
+                    ddg_future.cancel()  # Result unused (no-op if already running)
                 return {
                     "status": "success",
                     "results": ollama_result,
                     "source": "ollama_native",
                     "query": query
                 }
-        
-        # Strategy 2: Fallback to DuckDuckGo
-        ddg_results = self.search_with_duckduckgo(query, max_results)
+            # Strategy 2: Fallback to DuckDuckGo
+            ddg_results = ddg_future.result() if ddg_future is not None else self.search_with_duckduckgo(query, max_results)
+        else:
+            # Strategy 2: Fallback to DuckDuckGo
+            ddg_results = self.search_with_duckduckgo(query, max_results)
         
         if not ddg_results:
             return {
@@ -121,28 +192,27 @@ class SearchAdapter:
         
         # If use_llm, summarize DDG results with Ollama
         if use_llm:
+            results_text = "\n".join(f"{i}. {r['title']}: {r['snippet']}" for i, r in enumerate(ddg_results, 1))
             summary_prompt = f"""以下の検索結果を要約してください。
 
 検索クエリ: {query}
 
 検索結果:
-{chr(10).join([f"{i+1}. {r['title']}: {r['snippet']}" for i, r in enumerate(ddg_results)])}
+{results_text}
 
 要約:"""
             
             try:
-                response = requests.post(
-                    f"{self.ollama_url}/api/generate",
-                    json={
+                summary = self._generate_stream(
+                    {
                         "model": "qwen2.5:7b",
-                        "prompt": summary_prompt,
-                        "stream": False
+                        "prompt": summary_prompt
                     },
-                    timeout=30
+                    timeout=30,
+                    on_token=params.get("on_token")
                 )
                 
-                if response.status_code == 200:
-                    summary = response.json().get("response", "")
+                if summary is not None:
                     return {
                         "status": "success",
                         "results": summary,
@@ -1,12 +1,31 @@
 import base64
+import hashlib
 import io
 import re
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 import mss
 from PIL import Image
 import requests
 from src.adapter.interface import ToolAdapter
 from src.core.database import DatabaseManager
+from src.core import json_codec
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+def _frame_key(buf) -> int:
+    """Fast non-cryptographic fingerprint of a raw screenshot buffer"""
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(buf)
+    return int.from_bytes(hashlib.blake2b(buf, digest_size=8).digest(), "little")
 
 class PrivacyFilter:
     """
@@ -20,25 +39,61 @@ class PrivacyFilter:
             r"\b(?:\d[ -]*?){13,16}\b", # Credit Card (Simple)
             r"\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b" # IPv4
         ]
-        
+        # All patterns as one alternation, compiled once: a single pass per call
+        self._combined = re.compile("|".join(f"(?:{p})" for p in self.sensitive_patterns))
+        self._hs_db = self._compile_hyperscan()
+
+    def _compile_hyperscan(self):
+        """
+        Hyperscan database used as a one-pass prefilter, or None to use re only.
+        Match start offsets aren't tracked (the card pattern is too large for SOM mode),
+        so masking of a hit still goes through the combined re pattern.
+        Only used on ASCII text: its digit and word-boundary classes are ASCII-only, unlike re's.
+        """
+        if hyperscan is None:
+            return None
+        try:
+            db = hyperscan.Database()
+            db.compile(
+                expressions=[p.encode() for p in self.sensitive_patterns],
+                ids=list(range(len(self.sensitive_patterns))),
+                flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(self.sensitive_patterns)
+            )
+            return db
+        except Exception as e:
+            print(f"[Vision] Hyperscan compile failed, using re: {e}")
+            return None
+
+    def _hs_found(self, text: str) -> bool:
+        found = False
+
+        def on_match(pattern_id, start, end, flags, context):
+            nonlocal found
+            found = True
+            return True  # Stop at the first match
+
+        try:
+            self._hs_db.scan(text.encode("ascii"), match_event_handler=on_match)
+        except hyperscan.ScanTerminated:
+            pass
+        return found
+
     def check_text(self, text: str) -> bool:
         """
         Check if text contains sensitive patterns.
         Returns True if sensitive data is found.
         """
-        for pattern in self.sensitive_patterns:
-            if re.search(pattern, text):
-                return True
-        return False
+        if self._hs_db is not None and text.isascii():
+            return self._hs_found(text)
+        return self._combined.search(text) is not None
 
     def mask_text(self, text: str) -> str:
         """
         Masks sensitive parts of the text.
         """
-        masked_text = text
-        for pattern in self.sensitive_patterns:
-            masked_text = re.sub(pattern, "[REDACTED]", masked_text)
-        return masked_text
+        if self._hs_db is not None and text.isascii() and not self._hs_found(text):
+            return text
+        return self._combined.sub("[REDACTED]", text)
 
     # Note: OCR implementation would go here (e.g., using Tesseract or EasyOCR)
     # For now, we rely on VLM's "sensitive" check or assume text-based filtering on VLM output.
@@ -47,11 +102,24 @@ class VisionAdapter(ToolAdapter):
     """
     Handles screenshot capture and VLM analysis.
     """
+    # Characters of streamed VLM output rescanned per token (longer than any realistic match)
+    PRIVACY_SCAN_WINDOW = 256
+    # Recent frames whose JPEG/base64 encoding (and VLM answers) are kept
+    FRAME_CACHE_SIZE = 4
+
     def __init__(self, db_manager: DatabaseManager, ollama_url: str = "http://localhost:11434"):
         self.db = db_manager
         self.ollama_url = ollama_url
         self.privacy_filter = PrivacyFilter()
         self.sct = mss.mss()
+        # Keep-alive session so repeated VLM calls reuse the TCP connection
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # frame_key -> base64 JPEG, and (frame_key, prompt) -> VLM answer
+        self._encode_cache: "OrderedDict[int, str]" = OrderedDict()
+        self._answer_cache: "OrderedDict[tuple, str]" = OrderedDict()
 
     def execute(self, params: Dict[str, Any]) -> Any:
         # Deep check: Is this module allowed to run?
@@ -65,36 +133,66 @@ class VisionAdapter(ToolAdapter):
         prompt = params.get("prompt", "何が映っていますか？")
         return self.analyze_image(prompt)
 
+    def _grab(self):
+        """Grab the primary monitor as an MSS ScreenShot"""
+        # Capture primary monitor
+        monitor = self.sct.monitors[1] 
+        return self.sct.grab(monitor)
+
+    def _to_image(self, sct_img) -> Image.Image:
+        # sct_img.raw is the grabbed buffer itself; .bgra would first copy it into bytes
+        return Image.frombuffer("RGB", sct_img.size, sct_img.raw, "raw", "BGRX", 0, 1)
+
     def capture_screen(self) -> Optional[Image.Image]:
         """
         Captures the primary monitor.
         """
         try:
-            # Capture primary monitor
-            monitor = self.sct.monitors[1] 
-            sct_img = self.sct.grab(monitor)
-            img = Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
-            return img
+            return self._to_image(self._grab())
         except Exception as e:
             print(f"[Vision] Error capturing screen: {e}")
             return None
 
-    def analyze_image(self, prompt: str = "Describe this image.") -> Dict[str, Any]:
-        """
-        Analyzes the screen using a VLM (e.g., llava).
-        """
-        img = self.capture_screen()
-        if not img:
-            return {"error": "Failed to capture screen."}
+    def _encode_frame(self, sct_img) -> Tuple[int, str]:
+        """Thumbnail + JPEG + base64 of a frame, reused while the screen is unchanged"""
+        key = _frame_key(sct_img.raw)
+        cached = self._encode_cache.get(key)
+        if cached is not None:
+            self._encode_cache.move_to_end(key)
+            return key, cached
+
+        img = self._to_image(sct_img)
 
-        # Resize for performance (optional, depending on VLM)
-        img.thumbnail((1024, 1024))
+        # Resize for performance (optional, depending on VLM).
+        # reducing_gap does a cheap integer box reduce() first, so BICUBIC only sees ~2x the target size
+        img.thumbnail((1024, 1024), Image.Resampling.BICUBIC, reducing_gap=2.0)
         
         # Convert to base64
         buffered = io.BytesIO()
         img.save(buffered, format="JPEG")
         img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
 
+        self._encode_cache[key] = img_str
+        if len(self._encode_cache) > self.FRAME_CACHE_SIZE:
+            self._encode_cache.popitem(last=False)
+        return key, img_str
+
+    def analyze_image(self, prompt: str = "Describe this image.") -> Dict[str, Any]:
+        """
+        Analyzes the screen using a VLM (e.g., llava).
+        """
+        try:
+            frame_key, img_str = self._encode_frame(self._grab())
+        except Exception as e:
+            print(f"[Vision] Error capturing screen: {e}")
+            return {"error": "Failed to capture screen."}
+
+        # Same screen, same question: reuse the last answer
+        cached_answer = self._answer_cache.get((frame_key, prompt))
+        if cached_answer is not None:
+            self._answer_cache.move_to_end((frame_key, prompt))
+            return {"content": cached_answer, "image_base64": img_str}
+
         # 1. Privacy Check (Ask VLM if sensitive)
         # Note: This is costly. Optimally, we use local OCR first.
         # For this prototype, we will trust the VLM's "sensitive" flag if we implement it,
@@ -105,17 +203,35 @@ class VisionAdapter(ToolAdapter):
             "model": "llava", # Or moondream, depending on installation
             "prompt": prompt,
             "images": [img_str],
-            "stream": False
+            "stream": True
         }
         
         try:
-            response = requests.post(f"{self.ollama_url}/api/generate", json=payload)
-            response.raise_for_status()
-            result_text = response.json().get("response", "")
-            
-            # Post-process text with privacy filter
-            if self.privacy_filter.check_text(result_text):
-                 return {"error": "Sensitive information detected in VLM output.", "masked_content": self.privacy_filter.mask_text(result_text)}
+            with self.session.post(f"{self.ollama_url}/api/generate", json=payload, timeout=120, stream=True) as response:
+                response.raise_for_status()
+                parts = []
+                tail = ""
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json_codec.loads(line)
+                    token = chunk.get("response", "")
+                    parts.append(token)
+
+                    # Post-process text with privacy filter as it streams in.
+                    # Only the recent window is rescanned, so a match split across tokens is still caught.
+                    tail = (tail + token)[-self.PRIVACY_SCAN_WINDOW:]
+                    if self.privacy_filter.check_text(tail):
+                        # Leaving the with block closes the connection and stops the generation
+                        partial_text = "".join(parts)
+                        return {"error": "Sensitive information detected in VLM output.", "masked_content": self.privacy_filter.mask_text(partial_text)}
+                    if chunk.get("done"):
+                        break
+            result_text = "".join(parts)
+
+            self._answer_cache[(frame_key, prompt)] = result_text
+            if len(self._answer_cache) > self.FRAME_CACHE_SIZE:
+                self._answer_cache.popitem(last=False)
             
             return {"content": result_text, "image_base64": img_str} # Return base64 only if needed for posting
             
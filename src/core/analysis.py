@@ -1,5 +1,5 @@
-import json
 from typing import Dict, Any, List, Optional
+from src.core import json_codec
 from src.core.database import DatabaseManager
 from src.llm.client import LLMClient
 
@@ -28,8 +28,8 @@ class SentimentAnalyzer:
         """
         response = self.llm.generate(prompt, format="json")
         try:
-            return json.loads(response)
-        except json.JSONDecodeError:
+            return json_codec.loads(response)
+        except json_codec.JSONDecodeError:
             print(f"[Analysis] JSON Decode Error: {response}")
             return {"sentiment": "neutral", "score": 0.0, "emotions": []}
 
@@ -48,13 +48,14 @@ class UserAnalyzer:
         # Fetch recent master actions
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM master_actions ORDER BY timestamp DESC LIMIT 50")
+            cursor.row_factory = None  # Plain tuples; only three columns are needed
+            cursor.execute("SELECT timestamp, activity_type, detail FROM master_actions ORDER BY timestamp DESC LIMIT 50")
             rows = cursor.fetchall()
             
         if not rows:
             return "No recent master actions found."
             
-        logs = "\n".join([f"- [{row['timestamp']}] {row['activity_type']}: {row['detail']}" for row in rows])
+        logs = "\n".join([f"- [{ts}] {at}: {dt}" for ts, at, dt in rows])
         
         prompt = f"""
         Analyze the following log of the user's (Master's) recent actions.
@@ -1,21 +1,169 @@
+import queue
 import sqlite3
-from typing import List, Dict, Any, Optional
-import json
+import numpy as np
+import threading
+from typing import Iterator, List, Dict, Any, Optional, Tuple
 import time
+from src.core import json_codec
+from src.llm.client import LLMClient
 
 class DatabaseManager:
     """
     Manages SQLite connection and schema migrations.
     """
+    # Tables whose row counts are kept in the stats table
+    COUNTED_TABLES = ("memories", "master_actions", "users")
+
+    # Applied to every connection: WAL lets readers run during writes,
+    # synchronous=NORMAL drops the fsync per commit (still crash-safe in WAL mode)
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA cache_size=-65536",
+    )
+
+    # Prefix of int8-quantized embedding BLOBs (format version 1)
+    VECTOR_MAGIC = b"\x00Q8\x01"
+
+    # Background writer: queued inserts are committed together, up to
+    # WRITE_BATCH_SIZE rows or whatever arrives within WRITE_BATCH_WINDOW
+    WRITE_BATCH_SIZE = 256
+    WRITE_BATCH_WINDOW = 0.05  # seconds
+    # Batches hitting a locked database are retried with exponential backoff (0.1s, 0.2s, 0.4s)
+    WRITE_RETRIES = 3
+    WRITE_RETRY_BACKOFF = 0.1  # seconds
+
+    # Prepared statements kept per connection (sqlite3 default is 128)
+    STATEMENT_CACHE_SIZE = 512
+
+    # Per-cycle event queue statements, kept as constants so the statement cache reuses them
+    # (content/username are pulled out of the payload JSON by SQLite, not decoded in Python)
+    SQL_NEXT_EVENT = (
+        "SELECT id, source_type, json_extract(payload, '$.content') AS content, "
+        "json_extract(payload, '$.username') AS username "
+        "FROM pending_events WHERE processed = 0 "
+        "ORDER BY priority_score DESC, timestamp ASC LIMIT 1"
+    )
+    SQL_MARK_PROCESSED = "UPDATE pending_events SET processed = 1 WHERE id = ?"
+
     def __init__(self, db_path: str = "brain.db"):
         self.db_path = db_path
+        self._local = threading.local()
+        self._write_q: "queue.Queue" = queue.Queue()
+        self._writer_thread: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
         self.init_db()
 
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable dict-like access
+        """
+        Long-lived connection for the calling thread, opened on first use.
+        `with conn:` commits or rolls back but does not close it, so callers must not close it either.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=self.STATEMENT_CACHE_SIZE)
+            conn.row_factory = sqlite3.Row  # Enable dict-like access
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
         return conn
 
+    @staticmethod
+    def in_clause(values: List[Any]) -> Tuple[str, List[Any]]:
+        """
+        Placeholders and params for `IN (...)`, padded to a power of two by repeating the last value
+        so variable-length lists share a few cached statements instead of one per length.
+        """
+        size = 8
+        while size < len(values):
+            size *= 2
+        params = list(values) + [values[-1]] * (size - len(values))
+        return ",".join("?" * size), params
+
+    @staticmethod
+    def iter_rows(cursor: sqlite3.Cursor, batch: int = 256) -> Iterator[sqlite3.Row]:
+        """Yields a query's rows via fetchmany, without materializing the full result list."""
+        while True:
+            rows = cursor.fetchmany(batch)
+            if not rows:
+                return
+            yield from rows
+
+    def queue_write(self, sql: str, params: tuple):
+        """
+        Queue a write for the background writer thread (started on first use).
+        Returns immediately; the row is committed within WRITE_BATCH_WINDOW. Use flush() to wait.
+        """
+        if self._writer_thread is None:
+            with self._writer_lock:
+                if self._writer_thread is None:
+                    self._writer_thread = threading.Thread(target=self._writer, daemon=True)
+                    self._writer_thread.start()
+        self._write_q.put((sql, params))
+
+    def flush(self):
+        """Block until every queued write has been committed (call before shutdown)."""
+        if self._writer_thread is not None:
+            self._write_q.join()
+
+    def _writer(self):
+        conn = self.get_connection()
+        while True:
+            batch = [self._write_q.get()]
+            deadline = time.monotonic() + self.WRITE_BATCH_WINDOW
+            while len(batch) < self.WRITE_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._write_q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(conn, batch)
+            finally:
+                for _ in batch:
+                    self._write_q.task_done()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple[str, tuple]]):
+        """
+        Commits a batch with one executemany per statement in a single transaction.
+        A locked database is retried with backoff; if the batch still fails, rows are
+        written one at a time so only the failing row is dropped.
+        """
+        grouped: Dict[str, List[tuple]] = {}
+        for sql, params in batch:
+            grouped.setdefault(sql, []).append(params)
+
+        for attempt in range(self.WRITE_RETRIES + 1):
+            try:
+                with conn:
+                    for sql, rows in grouped.items():
+                        conn.executemany(sql, rows)
+                return
+            except sqlite3.OperationalError as e:
+                # Only "database is locked/busy" (another process holds the write lock) is transient
+                if "locked" not in str(e) and "busy" not in str(e):
+                    print(f"[DB] Batch of {len(batch)} row(s) failed: {e}")
+                    break
+                if attempt == self.WRITE_RETRIES:
+                    print(f"[DB] Batch of {len(batch)} row(s) failed after {attempt + 1} attempts: {e}")
+                    break
+                time.sleep(self.WRITE_RETRY_BACKOFF * 2 ** attempt)
+            except Exception as e:
+                print(f"[DB] Batch of {len(batch)} row(s) failed: {e}")
+                break
+
+        for sql, params in batch:
+            try:
+                with conn:
+                    conn.execute(sql, params)
+            except Exception as e:
+                print(f"[DB] Dropped queued write ({e}): {sql.split()[0]} {params!r:.200}")
+
     def init_db(self):
         """
         Initialize database schema.
@@ -90,6 +238,17 @@ class DatabaseManager:
             )
             """)
             
+            # 6. Master Actions (Observed activity of the master)
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS master_actions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp REAL,
+                activity_type TEXT,
+                detail TEXT,
+                sentiment TEXT
+            )
+            """)
+
             # 7. System Config (Feature Flags & Settings)
             cursor.execute("""
             CREATE TABLE IF NOT EXISTS system_config (
@@ -112,20 +271,176 @@ class DatabaseManager:
                 changed_by TEXT DEFAULT 'user'
             )
             """)
-            
+
+            # 9. Message Outbox (Posts/DMs queued for the platform bots)
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS message_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp REAL,
+                platform TEXT, -- 'discord', 'bluesky'
+                target_id TEXT, -- user_id or channel_id
+                content TEXT,
+                message_type TEXT, -- 'dm', 'post'
+                sent BOOLEAN DEFAULT 0
+            )
+            """)
+
+            # 10. LLM Response Cache (exact prompt match, see src/core/llm_cache.py)
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS llm_response_cache (
+                prompt_hash TEXT PRIMARY KEY, -- blake2b of model + system prompt + format + prompt
+                response TEXT,
+                ts REAL
+            )
+            """)
+
+            # 11. Stats (Row counters maintained by triggers, avoids COUNT(*) scans)
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stats (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+            """)
+            for table in self.COUNTED_TABLES:
+                # Seed from the current row count only the first time, then let triggers keep it up to date
+                cursor.execute(
+                    f"INSERT OR IGNORE INTO stats (key, value) SELECT ?, COUNT(*) FROM {table}",
+                    (f"{table}_count",)
+                )
+                cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_count_ai AFTER INSERT ON {table} BEGIN
+                    UPDATE stats SET value = value + 1 WHERE key = '{table}_count';
+                END
+                """)
+                cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_count_ad AFTER DELETE ON {table} BEGIN
+                    UPDATE stats SET value = value - 1 WHERE key = '{table}_count';
+                END
+                """)
+
+            # Persona version: bumped on any persona change so callers can cache the active persona
+            cursor.execute("INSERT OR IGNORE INTO stats (key, value) VALUES ('persona_version', 0)")
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS personas_version_{event.lower()} AFTER {event} ON personas BEGIN
+                    UPDATE stats SET value = value + 1 WHERE key = 'persona_version';
+                END
+                """)
+
+            # 12. Indexes (Dashboard/History views sort by newest first)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_memories_ts ON memories(timestamp DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_actions_log_ts ON actions_log(timestamp DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_master_actions_ts ON master_actions(timestamp DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_config_audit_ts ON config_audit_log(timestamp DESC)")
+            # Lookup paths: per-user memories, per-key config history, the active persona per role, unsent outbox rows.
+            # The outbox index is partial so it only holds the few rows still waiting to be sent.
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_memories_user_ts ON memories(user_id, timestamp DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_config_audit_key_ts ON config_audit_log(key, timestamp DESC)")
+            # Older databases get the role column from migrate_db, which creates this index afterwards
+            cursor.execute("PRAGMA table_info(personas)")
+            if "role" in {row[1] for row in cursor.fetchall()}:
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_personas_active_role ON personas(active, role)")
+            # Persona names are unique (scripts upsert by name); older duplicates get their id appended first
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_personas_name'")
+            if cursor.fetchone() is None:
+                cursor.execute("""
+                    UPDATE personas SET name = name || ' #' || id
+                    WHERE id NOT IN (SELECT MIN(id) FROM personas GROUP BY name)
+                """)
+                cursor.execute("CREATE UNIQUE INDEX idx_personas_name ON personas(name)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_platform_sent ON message_outbox(platform, sent) WHERE sent = 0")
+            # Same for the event queue: the next-event query reads it in index order, no sort
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_pending_unprocessed "
+                "ON pending_events(priority_score DESC, timestamp ASC) WHERE processed = 0"
+            )
+
+            # 13. Full-text search over memories and the action log (trigram handles Japanese text without word boundaries)
+            try:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memories_fts'")
+                fts_exists = cursor.fetchone() is not None
+                cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+                    content, content='memories', content_rowid='id', tokenize='trigram'
+                )
+                """)
+                cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS memories_fts_ai AFTER INSERT ON memories BEGIN
+                    INSERT INTO memories_fts(rowid, content) VALUES (new.id, new.content);
+                END
+                """)
+                cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS memories_fts_ad AFTER DELETE ON memories BEGIN
+                    INSERT INTO memories_fts(memories_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                END
+                """)
+                cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS memories_fts_au AFTER UPDATE OF content ON memories BEGIN
+                    INSERT INTO memories_fts(memories_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                    INSERT INTO memories_fts(rowid, content) VALUES (new.id, new.content);
+                END
+                """)
+                if not fts_exists:
+                    # Index rows that were stored before the FTS table existed
+                    cursor.execute("INSERT INTO memories_fts(memories_fts) VALUES ('rebuild')")
+
+                # Same for the action log's detail/reason text
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'actions_log_fts'")
+                fts_exists = cursor.fetchone() is not None
+                cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS actions_log_fts USING fts5(
+                    detail, reason, content='actions_log', content_rowid='id', tokenize='trigram'
+                )
+                """)
+                cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS actions_log_fts_ai AFTER INSERT ON actions_log BEGIN
+                    INSERT INTO actions_log_fts(rowid, detail, reason) VALUES (new.id, new.detail, new.reason);
+                END
+                """)
+                cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS actions_log_fts_ad AFTER DELETE ON actions_log BEGIN
+                    INSERT INTO actions_log_fts(actions_log_fts, rowid, detail, reason) VALUES ('delete', old.id, old.detail, old.reason);
+                END
+                """)
+                cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS actions_log_fts_au AFTER UPDATE OF detail, reason ON actions_log BEGIN
+                    INSERT INTO actions_log_fts(actions_log_fts, rowid, detail, reason) VALUES ('delete', old.id, old.detail, old.reason);
+                    INSERT INTO actions_log_fts(rowid, detail, reason) VALUES (new.id, new.detail, new.reason);
+                END
+                """)
+                if not fts_exists:
+                    cursor.execute("INSERT INTO actions_log_fts(actions_log_fts) VALUES ('rebuild')")
+            except sqlite3.OperationalError as e:
+                print(f"[DB] FTS5 unavailable, search will use LIKE: {e}")
+
             conn.commit()
             print("[DB] Database initialized.")
 
     # --- Helper methods ---
-    def add_to_outbox(self, platform: str, target_id: str, content: str, message_type: str = 'dm'):
+    def get_counts(self) -> Dict[str, int]:
+        """Returns the trigger-maintained row counts of COUNTED_TABLES."""
+        keys = [f"{table}_count" for table in self.COUNTED_TABLES]
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                """INSERT INTO message_outbox (timestamp, platform, target_id, content, message_type, sent) 
-                   VALUES (?, ?, ?, ?, ?, 0)""",
-                (time.time(), platform, target_id, content, message_type)
+                f"SELECT key, value FROM stats WHERE key IN ({','.join('?' * len(keys))})",
+                keys
             )
-            conn.commit()
+            counts = {row['key']: row['value'] for row in cursor.fetchall()}
+        return {table: counts.get(key, 0) for table, key in zip(self.COUNTED_TABLES, keys)}
+
+    def get_persona_version(self) -> int:
+        """Returns a counter that changes whenever the personas table is modified."""
+        with self.get_connection() as conn:
+            row = conn.execute("SELECT value FROM stats WHERE key = 'persona_version'").fetchone()
+        return row['value'] if row else 0
+
+    def add_to_outbox(self, platform: str, target_id: str, content: str, message_type: str = 'dm'):
+        self.queue_write(
+            """INSERT INTO message_outbox (timestamp, platform, target_id, content, message_type, sent) 
+               VALUES (?, ?, ?, ?, ?, 0)""",
+            (time.time(), platform, target_id, content, message_type)
+        )
 
     def get_pending_outbox(self, platform: str) -> List[Dict[str, Any]]:
         with self.get_connection() as conn:
@@ -136,11 +451,39 @@ class DatabaseManager:
             )
             return [dict(row) for row in cursor.fetchall()]
 
+    def claim_pending_outbox(self, platform: str) -> List[Dict[str, Any]]:
+        """
+        Atomically takes the unsent messages for a platform (sent: 0 -> 2 = claimed), so when several
+        processes poll the same outbox each row goes to exactly one of them.
+        Send with the returned rows, then mark_outbox_sent or release_outbox on failure.
+        """
+        with self.get_connection() as conn:
+            rows = conn.execute(
+                "UPDATE message_outbox SET sent = 2 WHERE platform = ? AND sent = 0 RETURNING *",
+                (platform,)
+            ).fetchall()
+            conn.commit()
+        return sorted((dict(row) for row in rows), key=lambda row: row['id'])
+
+    def release_outbox(self, message_id: int):
+        """Puts a claimed message back in the queue after a failed send."""
+        with self.get_connection() as conn:
+            conn.execute("UPDATE message_outbox SET sent = 0 WHERE id = ? AND sent = 2", (message_id,))
+            conn.commit()
+
     def mark_outbox_sent(self, message_id: int):
         with self.get_connection() as conn:
             conn.execute("UPDATE message_outbox SET sent = 1 WHERE id = ?", (message_id,))
             conn.commit()
 
+    def mark_outbox_sent_many(self, message_ids: List[int]):
+        if not message_ids:
+            return
+        placeholders, params = self.in_clause(message_ids)
+        with self.get_connection() as conn:
+            conn.execute(f"UPDATE message_outbox SET sent = 1 WHERE id IN ({placeholders})", params)
+            conn.commit()
+
     # --- Helper methods will act as the Data Access Layer ---
     def add_user(self, username: str, display_name: str = None):
         with self.get_connection() as conn:
@@ -161,38 +504,86 @@ class DatabaseManager:
                 return dict(row)
             return None
 
-    def log_action(self, action_type: str, detail: Dict[str, Any], reason: str):
+    def get_cached_response(self, prompt_hash: str, min_ts: float = 0.0) -> Optional[str]:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                "INSERT INTO actions_log (timestamp, action_type, detail, reason) VALUES (?, ?, ?, ?)",
-                (time.time(), action_type, json.dumps(detail), reason)
+                "SELECT response FROM llm_response_cache WHERE prompt_hash = ? AND ts >= ?",
+                (prompt_hash, min_ts)
             )
-            conn.commit()
+            row = cursor.fetchone()
+            return row['response'] if row else None
+
+    def cache_response(self, prompt_hash: str, response: str):
+        self.queue_write(
+            "INSERT OR REPLACE INTO llm_response_cache (prompt_hash, response, ts) VALUES (?, ?, ?)",
+            (prompt_hash, response, time.time())
+        )
+
+    def log_action(self, action_type: str, detail: Dict[str, Any], reason: str):
+        self.queue_write(
+            "INSERT INTO actions_log (timestamp, action_type, detail, reason) VALUES (?, ?, ?, ?)",
+            (time.time(), action_type, json_codec.dumps(detail), reason)
+        )
 
     def log_master_action(self, activity_type: str, detail: str, sentiment: str = "neutral"):
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO master_actions (timestamp, activity_type, detail, sentiment) VALUES (?, ?, ?, ?)",
-                (time.time(), activity_type, detail, sentiment)
-            )
-            conn.commit()
+        self.queue_write(
+            "INSERT INTO master_actions (timestamp, activity_type, detail, sentiment) VALUES (?, ?, ?, ?)",
+            (time.time(), activity_type, detail, sentiment)
+        )
 
     def add_pending_event(self, source_type: str, payload: Dict[str, Any], priority: int = 0):
+        self.queue_write(
+            """INSERT INTO pending_events (timestamp, source_type, payload, priority_score, processed) 
+               VALUES (?, ?, ?, ?, 0)""",
+            (time.time(), source_type, json_codec.dumps(payload), priority)
+        )
+
+    def get_next_event(self) -> Optional[Dict[str, Any]]:
+        """Highest-priority unprocessed event, or None."""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """INSERT INTO pending_events (timestamp, source_type, payload, priority_score, processed) 
-                   VALUES (?, ?, ?, ?, 0)""",
-                (time.time(), source_type, json.dumps(payload, ensure_ascii=False), priority)
-            )
-            conn.commit()
+            row = conn.execute(self.SQL_NEXT_EVENT).fetchone()
+            return dict(row) if row else None
+
+    def mark_event_processed(self, event_id: int):
+        self.queue_write(self.SQL_MARK_PROCESSED, (event_id,))
+
+    def add_chat_memory(self, user_id: int, content: str, emotions: List[str] = None,
+                        sentiment: float = 0.0, memory_type: str = "chat"):
+        """
+        Queues a memory without an embedding (so semantic search never returns it).
+        For chat logs written from latency-sensitive paths; use save_memory when the embedding matters.
+        """
+        now = time.time()
+        self.queue_write(
+            """INSERT INTO memories (user_id, timestamp, content, emotion_tags, sentiment_score, memory_type, last_accessed_at) 
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (user_id, now, content, json_codec.dumps(emotions or []), sentiment, memory_type, now)
+        )
 
     def _encode_vector(self, vector: List[float]) -> bytes:
-        if not vector:
+        """
+        Symmetric int8 quantization: VECTOR_MAGIC + float32 scale + one int8 per dimension
+        (a quarter of the float32 size, within ~1% cosine of the original).
+        """
+        if vector is None or len(vector) == 0:
             return b''
-        return struct.pack(f'{len(vector)}f', *vector)
+        arr = np.asarray(vector, dtype=np.float32)
+        scale = float(np.max(np.abs(arr))) / 127.0 or 1.0
+        quantized = np.clip(np.round(arr / scale), -127, 127).astype(np.int8)
+        return self.VECTOR_MAGIC + np.float32(scale).tobytes() + quantized.tobytes()
+
+    def _decode_vector(self, blob: Optional[bytes]) -> np.ndarray:
+        """float32 embedding from a BLOB; older rows without VECTOR_MAGIC are plain float32."""
+        if not blob:
+            return np.empty(0, dtype=np.float32)
+        if blob[:4] == self.VECTOR_MAGIC:
+            scale = np.frombuffer(blob, dtype=np.float32, count=1, offset=4)[0]
+            vec = np.frombuffer(blob, dtype=np.int8, offset=8).astype(np.float32)
+            vec *= scale  # in place: one float32 allocation per row
+            return vec
+        # Zero-copy, read-only view of the BLOB
+        return np.frombuffer(blob, dtype=np.float32)
 
     def save_memory(self, content: str, user_id: Optional[int] = None, 
                     sentiment: float = 0.0, emotions: List[str] = None, 
@@ -200,31 +591,57 @@ class DatabaseManager:
         """
         Saves a memory with embedding and biological metadata.
         """
-        from src.llm.client import LLMClient
+        return self.save_memories_bulk([{
+            "content": content,
+            "user_id": user_id,
+            "sentiment": sentiment,
+            "emotions": emotions,
+            "memory_type": memory_type
+        }], llm_client=llm_client)[0]
+
+    def save_memories_bulk(self, items: List[Dict[str, Any]], llm_client: Optional[Any] = None) -> List[int]:
+        """
+        Saves several memories: one embedding request for all of them and one transaction.
+        Each item has 'content' and optionally 'user_id', 'sentiment', 'emotions', 'memory_type'.
+        Returns the new memory ids in item order.
+        """
+        if not items:
+            return []
         llm = llm_client or LLMClient()
         
-        # 1. Generate Embedding
-        vector = llm.get_embedding(content)
-        vector_blob = self._encode_vector(vector)
+        # 1. Generate Embeddings (a single item keeps using the per-text endpoint)
+        if len(items) == 1:
+            vectors = [llm.get_embedding(items[0]["content"])]
+        else:
+            vectors = llm.get_embeddings([item["content"] for item in items])
         
-        # 2. Base Importance (Simplified: higher for extreme sentiment)
-        base_importance = 0.5 + (abs(sentiment) * 0.5)
+        now = time.time()
+        rows = []
+        for item, vector in zip(items, vectors):
+            sentiment = item.get("sentiment", 0.0)
+            # 2. Base Importance (Simplified: higher for extreme sentiment)
+            base_importance = 0.5 + (abs(sentiment) * 0.5)
+            rows.append((
+                item.get("user_id"), now, item["content"], self._encode_vector(vector),
+                json_codec.dumps(item.get("emotions") or []), sentiment, item.get("memory_type", "chat"),
+                base_importance, base_importance, now
+            ))
         
+        ids = []
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO memories (
-                    user_id, timestamp, content, embedding_vector, 
-                    emotion_tags, sentiment_score, memory_type,
-                    stability, base_importance, last_accessed_at, recall_count
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
-            """, (
-                user_id, time.time(), content, vector_blob,
-                json.dumps(emotions or []), sentiment, memory_type,
-                base_importance, base_importance, time.time()
-            ))
+            # Same SQL text each time, so sqlite3's statement cache reuses the compiled statement
+            for row in rows:
+                cursor.execute("""
+                    INSERT INTO memories (
+                        user_id, timestamp, content, embedding_vector, 
+                        emotion_tags, sentiment_score, memory_type,
+                        stability, base_importance, last_accessed_at, recall_count
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+                """, row)
+                ids.append(cursor.lastrowid)
             conn.commit()
-            return cursor.lastrowid
+        return ids
 
     def get_active_persona(self, role: Optional[str] = None) -> Optional[Dict[str, Any]]:
         with self.get_connection() as conn:
@@ -256,12 +673,12 @@ class DatabaseManager:
                     UPDATE personas 
                     SET system_prompt = ?, metadata_json = ?, role = ?, active = ? 
                     WHERE id = ?
-                """, (system_prompt, json.dumps(card_data, ensure_ascii=False), role, int(active), existing[0]))
+                """, (system_prompt, json_codec.dumps(card_data), role, int(active), existing[0]))
             else:
                 cursor.execute("""
                     INSERT INTO personas (name, role, system_prompt, metadata_json, active)
                     VALUES (?, ?, ?, ?, ?)
-                """, (name, role, system_prompt, json.dumps(card_data, ensure_ascii=False), int(active)))
+                """, (name, role, system_prompt, json_codec.dumps(card_data), int(active)))
             conn.commit()
 
     def get_config(self, key: str, default: Any = None) -> Any:
@@ -271,38 +688,71 @@ class DatabaseManager:
             cursor.execute("SELECT value FROM system_config WHERE key = ?", (key,))
             row = cursor.fetchone()
             if row:
-                try:
-                    return json.loads(row[0])
-                except:
-                    return row[0]
+                return self._decode_config_value(row[0])
             return default
 
+    def get_configs(self, keys: List[str], default: Any = None) -> Dict[str, Any]:
+        """Retrieves several configuration values in one query. Missing keys map to default."""
+        if not keys:
+            return {}
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT key, value FROM system_config WHERE key IN ({','.join('?' * len(keys))})",
+                list(keys)
+            )
+            found = {row['key']: self._decode_config_value(row['value']) for row in cursor.fetchall()}
+        return {key: found.get(key, default) for key in keys}
+
+    def _decode_config_value(self, raw: str) -> Any:
+        try:
+            return json_codec.loads(raw)
+        except:
+            return raw
+
     def set_config(self, key: str, value: Any, reason: str = "No reason provided", changed_by: str = "user"):
         """Sets a configuration value and records the change in the audit log."""
-        str_value = json.dumps(value) if not isinstance(value, (str, int, float, bool)) else str(value)
+        self.set_configs([(key, value, reason)], changed_by=changed_by)
+
+    def set_configs(self, changes: List[Tuple[str, Any, str]], changed_by: str = "user"):
+        """
+        Sets several (key, value, reason) configuration values in one transaction,
+        with an audit log entry for each.
+        """
+        if not changes:
+            return
         now = time.time()
+        rows = [
+            (key, json_codec.dumps(value) if not isinstance(value, (str, int, float, bool)) else str(value), reason)
+            for key, value, reason in changes
+        ]
         
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            # Get old value for audit
-            cursor.execute("SELECT value FROM system_config WHERE key = ?", (key,))
-            old_row = cursor.fetchone()
-            old_value = old_row[0] if old_row else None
+            # Get old values for audit (one query for all keys)
+            placeholders, params = self.in_clause([key for key, _, _ in rows])
+            cursor.execute(f"SELECT key, value FROM system_config WHERE key IN ({placeholders})", params)
+            current = {row['key']: row['value'] for row in cursor.fetchall()}
+            audit = []
+            for key, str_value, reason in rows:
+                audit.append((now, key, current.get(key), str_value, reason, changed_by))
+                current[key] = str_value
             
             # Upsert config
-            cursor.execute("""
+            cursor.executemany("""
                 INSERT INTO system_config (key, value, updated_at) 
                 VALUES (?, ?, ?)
                 ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
-            """, (key, str_value, now))
+            """, [(key, str_value, now) for key, str_value, _ in rows])
             
             # Insert audit log
-            cursor.execute("""
+            cursor.executemany("""
                 INSERT INTO config_audit_log (timestamp, key, old_value, new_value, reason, changed_by)
                 VALUES (?, ?, ?, ?, ?, ?)
-            """, (now, key, old_value, str_value, reason, changed_by))
+            """, audit)
             
             conn.commit()
+        for key, str_value, reason in rows:
             print(f"[DB] Config '{key}' updated. Mode: {str_value}. Reason: {reason}")
 
     def set_system_alert(self, message: str, level: str = "warning"):
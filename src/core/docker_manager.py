@@ -1,19 +1,90 @@
+import atexit
+import fnmatch
 import subprocess
+import io
 import os
+import socket
+import tarfile
 import tempfile
+import threading
+import time
 import uuid
-from typing import Dict, Any, List, Optional
+from dataclasses import dataclass, field
+from pathlib import PureWindowsPath
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import docker
+except ImportError:  # Falls back to the docker CLI
+    docker = None
+
+# Never copied into sandbox containers (VCS data, caches, dependency trees)
+SYNC_IGNORE_PATTERNS = (
+    '.git', '__pycache__', 'node_modules', '.venv', 'venv',
+    '.mypy_cache', '.pytest_cache', '*.pyc',
+)
+
+# Pool containers are labelled with their owning process, so orphans can be told apart at startup
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        import ctypes
+        # PROCESS_QUERY_LIMITED_INFORMATION; os.kill would terminate the process on Windows
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _is_ignored(name: str) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in SYNC_IGNORE_PATTERNS)
+
+@dataclass
+class _PoolEntry:
+    """A warm container plus the host file state it was last synced with."""
+    container: Any
+    snapshot: Dict[str, tuple] = field(default_factory=dict)
+    last_used: float = field(default_factory=time.monotonic)
 
 class DockerManager:
     """
-    Manages ephemeral Docker containers for secure task execution.
+    Manages sandbox Docker containers for secure task execution.
     Provides isolation between the AI's technical actions and the host system.
     """
+    # Warm containers unused for this long are removed on the next call
+    POOL_IDLE_TTL = 600  # seconds
+    STAMP_SLACK = 2.0  # seconds
+
     def __init__(self, default_image: str = "python:3.11-slim"):
         self.default_image = default_image
+        # Persistent Docker SDK client (one API connection instead of a CLI process per step)
+        self._client = None
+        # (image, abs workspace) -> warm container
+        self._pool: Dict[Tuple[str, str], _PoolEntry] = {}
+        self._pool_lock = threading.Lock()
         self._check_docker_available()
+        if self._client is not None:
+            self._reap_orphans()
+            atexit.register(self.close)
 
     def _check_docker_available(self):
+        if docker is not None:
+            try:
+                self._client = docker.from_env()
+                self._client.ping()
+                print("[DockerManager] Connected to Docker daemon.")
+                return
+            except Exception as e:
+                print(f"[DockerManager] Docker SDK could not connect ({e}), using docker CLI.")
+                self._client = None
         try:
             subprocess.run(["docker", "--version"], check=True, capture_output=True)
             print("[DockerManager] Connected to Docker daemon.")
@@ -24,18 +95,256 @@ class DockerManager:
         """
         Converts a Windows path to a Docker-friendly format (/c/path/...).
         """
-        abs_path = os.path.abspath(path)
+        p = PureWindowsPath(os.path.abspath(path))
         # Handle drive letter (C:\ -> /c/)
-        if ":" in abs_path:
-            drive, rest = abs_path.split(":", 1)
-            return f"/{drive.lower()}{rest.replace('\\', '/')}"
-        return abs_path.replace('\\', '/')
+        drive = p.drive.rstrip(":").lower()
+        return f"/{drive}{p.as_posix()[2:]}" if drive else p.as_posix()
+
+    def _start_container(self, image: str, name: str):
+        """Create and start an idle container with /workspace as its working dir (pulls the image if missing)"""
+        kwargs = dict(command=["tail", "-f", "/dev/null"], working_dir="/workspace", name=name,
+                      labels={"rito.pool": "1", "rito.pool.owner": _OWNER})
+        try:
+            container = self._client.containers.create(image, **kwargs)
+        except docker.errors.ImageNotFound:
+            print(f"[Docker] Pulling image {image}...")
+            self._client.images.pull(image)
+            container = self._client.containers.create(image, **kwargs)
+        container.start()
+        return container
+
+    def _scan_workspace(self, abs_workspace: str) -> Dict[str, tuple]:
+        """relative path -> (mtime_ns, size) for every synced file in the host workspace"""
+        snapshot = {}
+        for root, dirs, files in os.walk(abs_workspace):
+            dirs[:] = [d for d in dirs if not _is_ignored(d)]
+            for name in files:
+                if _is_ignored(name):
+                    continue
+                full = os.path.join(root, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                rel = os.path.relpath(full, abs_workspace).replace(os.sep, "/")
+                snapshot[rel] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def _container_files(self, container) -> Dict[str, int]:
+        """relative path -> size for every synced file in the container's /workspace"""
+        _, (listing, _) = container.exec_run(
+            ["find", ".", "-type", "f", "-exec", "stat", "-c", "%s %n", "{}", "+"], user="root", demux=True
+        )
+        files = {}
+        for line in (listing or b"").decode("utf-8", errors="replace").splitlines():
+            size, _, path = line.partition(" ")
+            if not path.startswith("./") or not size.isdigit():
+                continue
+            rel = path[2:]
+            if not any(_is_ignored(part) for part in rel.split("/")):
+                files[rel] = int(size)
+        return files
+
+    def _put_files(self, container, abs_workspace: str, rels: List[str]):
+        """Copy the given workspace files into /workspace as an in-memory tar"""
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            for rel in rels:
+                tar.add(os.path.join(abs_workspace, rel), arcname=rel, recursive=False)
+        container.put_archive("/workspace", buf.getvalue())
+
+    def _acquire(self, image: str, abs_workspace: str) -> "_PoolEntry":
+        """
+        Warm container for (image, workspace), created on first use.
+        Host files added or changed since the last sync are copied in, deleted ones removed.
+        """
+        self._reap_idle()
+        key = (image, abs_workspace)
+        entry = self._pool.get(key)
+        if entry is not None:
+            try:
+                entry.container.reload()
+                if entry.container.status != "running":
+                    raise RuntimeError(entry.container.status)
+            except Exception:
+                self._discard(key)
+                entry = None
+
+        current = self._scan_workspace(abs_workspace)
+        if entry is None:
+            container = self._start_container(image, f"rito_exec_{uuid.uuid4().hex[:8]}")
+            entry = _PoolEntry(container)
+            self._pool[key] = entry
+            print(f"[Docker] Copying workspace to container {container.name}...")
+            removed = []
+        else:
+            # Earlier commands may have deleted or rewritten files without that reaching the host
+            # (deletions, failed patches): files that no longer match are pushed again, extras removed
+            in_container = self._container_files(entry.container)
+            entry.snapshot = {rel: sig for rel, sig in entry.snapshot.items() if in_container.get(rel) == sig[1]}
+            removed = [rel for rel in in_container if rel not in current]
+        changed = [rel for rel, sig in current.items() if entry.snapshot.get(rel) != sig]
+        if changed:
+            self._put_files(entry.container, abs_workspace, changed)
+        if removed:
+            entry.container.exec_run(["rm", "-f", "--", *removed], user="root")
+        entry.snapshot = current
+        entry.last_used = time.monotonic()
+        return entry
+
+    def _put_tmp_files(self, container, files: Dict[str, bytes], mtime: Optional[float] = None):
+        """Write small files into the container's /tmp (outside the workspace)"""
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            for name, data in files.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = mtime if mtime is not None else time.time()
+                tar.addfile(info, io.BytesIO(data))
+        container.put_archive("/tmp", buf.getvalue())
+
+    def _stamp(self, container):
+        """
+        Mark the start of a command: files newer than /tmp/.rito_stamp get synced back.
+        Backdated a little because filesystem timestamps are coarse; at worst an unchanged file is copied back.
+        """
+        self._put_tmp_files(container, {".rito_stamp": b""}, mtime=time.time() - self.STAMP_SLACK)
+
+    def _sync_back(self, entry: "_PoolEntry", abs_workspace: str):
+        """Copy files the command created or modified (newer than the stamp) back to the host"""
+        _, (listing, _) = entry.container.exec_run(
+            ["find", ".", "-type", "f", "-newer", "/tmp/.rito_stamp"], user="root", demux=True
+        )
+        rels = [line[2:] for line in (listing or b"").decode("utf-8", errors="replace").splitlines() if line.startswith("./")]
+        # Caches the command produced (e.g. __pycache__) stay in the container
+        rels = [rel for rel in rels if not any(_is_ignored(part) for part in rel.split("/"))]
+        if not rels:
+            return
+        _, (data, _) = entry.container.exec_run(["tar", "-cf", "-", "--", *rels], user="root", demux=True)
+        with tarfile.open(fileobj=io.BytesIO(data or b"")) as tar:
+            if hasattr(tarfile, "data_filter"):
+                tar.extractall(abs_workspace, filter="data")
+            else:
+                tar.extractall(abs_workspace)
+        # Already in sync, so the next call doesn't copy them straight back in
+        for rel in rels:
+            try:
+                st = os.stat(os.path.join(abs_workspace, rel))
+                entry.snapshot[rel] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                pass
+
+    def _exec(self, container, command: List[str]) -> Dict[str, Any]:
+        exit_code, (stdout, stderr) = container.exec_run(command, user="root", demux=True)
+        return {
+            "exit_code": exit_code,
+            "stdout": (stdout or b"").decode("utf-8", errors="replace"),
+            "stderr": (stderr or b"").decode("utf-8", errors="replace")
+        }
+
+    def _discard(self, key: tuple):
+        entry = self._pool.pop(key, None)
+        if entry is not None:
+            try:
+                entry.container.remove(force=True)
+            except Exception:
+                pass
+
+    def _reap_orphans(self):
+        """
+        Remove pool containers left running by a process that died without its atexit cleanup.
+        Containers owned by a live process on this host (another Controller) are kept.
+        """
+        try:
+            containers = self._client.containers.list(all=True, filters={"label": "rito.pool=1"})
+        except Exception as e:
+            print(f"[DockerManager] Could not list pool containers: {e}")
+            return
+        for container in containers:
+            host, _, pid = container.labels.get("rito.pool.owner", "").rpartition(":")
+            if host == socket.gethostname() and pid.isdigit() and _pid_alive(int(pid)):
+                continue
+            if host and host != socket.gethostname():
+                continue  # Another machine sharing the daemon
+            try:
+                container.remove(force=True)
+                print(f"[DockerManager] Removed orphaned container {container.name}.")
+            except Exception:
+                pass
+
+    def _reap_idle(self):
+        now = time.monotonic()
+        for key in [k for k, e in self._pool.items() if now - e.last_used > self.POOL_IDLE_TTL]:
+            self._discard(key)
+
+    def close(self):
+        """Remove all warm containers."""
+        with self._pool_lock:
+            for key in list(self._pool):
+                self._discard(key)
 
     def run_in_container(self, command: str, image: Optional[str] = None, workspace_path: str = ".") -> Dict[str, Any]:
         """
-        Executes a command inside a fresh Docker container by copying files in and out.
-        Bypasses volume mounting issues.
+        Executes a command inside a warm Docker container for this image and workspace.
+        Files are copied in and out (only what changed), which bypasses volume mounting issues.
+        """
+        if self._client is None:
+            return self._run_in_container_cli(command, image, workspace_path)
+
+        image = image or self.default_image
+        abs_workspace = os.path.abspath(workspace_path)
+        with self._pool_lock:
+            try:
+                entry = self._acquire(image, abs_workspace)
+
+                # Run command (the stamp marks which files it touches)
+                print(f"[Docker] Executing: {command}")
+                self._stamp(entry.container)
+                result = self._exec(entry.container, ["sh", "-c", command])
+
+                # Copy results back
+                print(f"[Docker] Syncing results back to {abs_workspace}...")
+                self._sync_back(entry, abs_workspace)
+
+                return {"status": "success" if result["exit_code"] == 0 else "failed", **result}
+            except Exception as e:
+                self._discard((image, abs_workspace))
+                return {"status": "error", "error": str(e)}
+
+    def apply_patch(self, diff_content: str, workspace_path: str = ".") -> Dict[str, Any]:
+        """
+        Applies a git-style diff inside a warm container.
         """
+        if self._client is None:
+            return self._apply_patch_cli(diff_content, workspace_path)
+
+        image = "alpine/git"
+        abs_workspace = os.path.abspath(workspace_path)
+        with self._pool_lock:
+            try:
+                entry = self._acquire(image, abs_workspace)
+
+                # The patch goes in /tmp, outside the workspace
+                self._put_tmp_files(entry.container, {"rito.patch": diff_content.encode("utf-8")})
+
+                # Apply patch using git apply
+                print(f"[Docker] Applying patch via git apply...")
+                self._stamp(entry.container)
+                result = self._exec(entry.container, ["git", "apply", "--no-index", "--ignore-whitespace", "/tmp/rito.patch"])
+
+                if result["exit_code"] == 0:
+                    print(f"[Docker] Patch applied. Syncing host...")
+                    self._sync_back(entry, abs_workspace)
+                    return {"status": "success", "stdout": result["stdout"], "stderr": result["stderr"]}
+                else:
+                    return {"status": "failed", "stdout": result["stdout"], "stderr": result["stderr"]}
+
+            except Exception as e:
+                self._discard((image, abs_workspace))
+                return {"status": "error", "error": str(e)}
+
+    def _run_in_container_cli(self, command: str, image: Optional[str] = None, workspace_path: str = ".") -> Dict[str, Any]:
+        """run_in_container via the docker CLI (used when the Docker SDK is unavailable)"""
         image = image or self.default_image
         abs_workspace = os.path.abspath(workspace_path)
         container_name = f"rito_exec_{uuid.uuid4().hex[:8]}"
@@ -72,10 +381,8 @@ class DockerManager:
             # Cleanup
             subprocess.run(["docker", "rm", "-f", container_name], capture_output=True)
 
-    def apply_patch(self, diff_content: str, workspace_path: str = ".") -> Dict[str, Any]:
-        """
-        Applies a git-style diff inside a container using stdin for the diff.
-        """
+    def _apply_patch_cli(self, diff_content: str, workspace_path: str = ".") -> Dict[str, Any]:
+        """apply_patch via the docker CLI, passing the diff on stdin (used when the Docker SDK is unavailable)"""
         abs_workspace = os.path.abspath(workspace_path)
         container_name = f"rito_patch_{uuid.uuid4().hex[:8]}"
         image = "alpine/git"
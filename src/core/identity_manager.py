@@ -4,14 +4,73 @@ Handles multi-platform identity linking and merge requests
 """
 from typing import Dict, List, Optional, Any
 import time
-import json
+from src.core import json_codec
+from src.core.llm_cache import LLMResponseCache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from rapidfuzz import process as rf_process
+    from rapidfuzz.distance import JaroWinkler
+except ImportError:
+    rf_process = None
+    JaroWinkler = None
+
+
+def _jaro_winkler(s1: str, s2: str, prefix_weight: float = 0.1) -> float:
+    """Pure-Python Jaro-Winkler similarity (0..1), matching RapidFuzz's normalized_similarity"""
+    if s1 == s2:
+        return 1.0
+    len1, len2 = len(s1), len(s2)
+    if not len1 or not len2:
+        return 0.0
+
+    window = max(max(len1, len2) // 2 - 1, 0)
+    flags1 = [False] * len1
+    flags2 = [False] * len2
+    matches = 0
+    for i, ch in enumerate(s1):
+        for j in range(max(0, i - window), min(len2, i + window + 1)):
+            if not flags2[j] and s2[j] == ch:
+                flags1[i] = flags2[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+
+    transpositions = 0
+    j = 0
+    for i in range(len1):
+        if flags1[i]:
+            while not flags2[j]:
+                j += 1
+            if s1[i] != s2[j]:
+                transpositions += 1
+            j += 1
+    jaro = (matches / len1 + matches / len2 + (matches - transpositions // 2) / matches) / 3
+
+    if jaro <= 0.7:
+        return jaro
+    prefix = 0
+    for a, b in zip(s1[:4], s2[:4]):
+        if a != b:
+            break
+        prefix += 1
+    return jaro + prefix * prefix_weight * (1 - jaro)
 
 class IdentityManager:
     """Manages user identities across multiple platforms"""
+
+    NAME_MATCH_CUTOFF = 0.85
+    NAME_LENGTH_RATIO = 0.3
     
     def __init__(self, db_manager, llm_client=None):
         self.db = db_manager
         self.llm = llm_client
+        self.llm_cache = LLMResponseCache(db_manager, llm_client) if llm_client else None
     
     def register_identity(
         self, 
@@ -76,7 +135,24 @@ class IdentityManager:
                 (user_id,)
             )
             return [dict(row) for row in cursor.fetchall()]
-    
+
+    def get_identities_for_users(self, user_ids: List[int], chunk_size: int = 500) -> Dict[int, List[Dict]]:
+        """Get identities for many users at once, grouped by user_id"""
+        identities = {user_id: [] for user_id in user_ids}
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            # Chunked to stay under SQLite's bound parameter limit
+            for i in range(0, len(user_ids), chunk_size):
+                chunk = user_ids[i:i + chunk_size]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT * FROM user_identities WHERE user_id IN ({placeholders})",
+                    chunk
+                )
+                for row in cursor.fetchall():
+                    identities.setdefault(row['user_id'], []).append(dict(row))
+        return identities
+
     def create_merge_request(
         self,
         source_identity_id: int,
@@ -178,44 +254,92 @@ class IdentityManager:
             active_persona = self.db.get_active_persona(role="analysis")
             system_prompt = active_persona["system_prompt"] if active_persona else "あなたは分析担当のリトだ。"
             
+            # Fixed instructions first and the data last, so the prompt prefix is identical across calls.
+            # Rows are '|'-separated lines instead of JSON to keep the token count down.
+            user_lines = "\n".join(f"{u['id']}|{u['username']}" for u in users)
+            identity_lines = "\n".join(
+                f"{i['id']}|{i['user_id']}|{i['platform']}|{i['platform_id']}|{i['display_name']}"
+                for i in identities if i['display_name']
+            )
             prompt = f"""以下のユーザーリストと、各プラットフォームのアイデンティティ（アカウント）リストを照合してください。
 同一人物である可能性が高い組み合わせを見つけ出し、理由と共に提案してください。
 
-ユーザーリスト: {json.dumps(users, ensure_ascii=False)}
-アイデンティティリスト: {json.dumps(identities, ensure_ascii=False)}
-
 JSON形式のみで返答してください:
 {{
   "suggestions": [
      {{"identity1_id": ID, "identity2_id": ID, "confidence": 0.0-1.0, "reason": "理由"}}
   ]
-}}"""
+}}
+
+ユーザーリスト (id|username):
+{user_lines}
+
+アイデンティティリスト (id|user_id|platform|platform_id|display_name):
+{identity_lines}"""
             try:
-                response = self.llm.generate(prompt, system_prompt=system_prompt, format="json")
-                data = json.loads(response)
+                response = self.llm_cache.generate(prompt, system_prompt=system_prompt, format="json")
+                data = json_codec.loads(response)
                 # Map back to internal ID format if needed or return suggestions
                 return data.get("suggestions", [])
             except Exception as e:
                 print(f"[IdentityManager] LLM detection failed: {e}")
 
         # 3. Simple heuristic fallback: match by display_name
+        return self._match_display_names(identities)
+
+    def _match_display_names(self, identities: List[Dict]) -> List[Dict]:
+        """Pair identities of different users whose display names look alike"""
+        names = [(i['display_name'] or "").lower() for i in identities]
+
+        # Jaro-Winkler weighs the prefix heavily, so only names sharing a first character are compared
+        buckets: Dict[str, List[int]] = {}
+        for idx, name in enumerate(names):
+            if name:
+                buckets.setdefault(name[0], []).append(idx)
+
+        pairs = []
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            bucket_names = [names[i] for i in members]
+            if rf_process is not None and np is not None:
+                # Scores under the cutoff come back as 0, letting RapidFuzz pick its faster path
+                scores = rf_process.cdist(
+                    bucket_names, bucket_names,
+                    scorer=JaroWinkler.normalized_similarity,
+                    score_cutoff=self.NAME_MATCH_CUTOFF,
+                    workers=-1
+                )
+                # Names of clearly different length are not the same person even with a shared prefix
+                lengths = np.array([len(n) for n in bucket_names])
+                longer = np.maximum(lengths[:, None], lengths[None, :])
+                similar_len = np.abs(lengths[:, None] - lengths[None, :]) < self.NAME_LENGTH_RATIO * longer
+                matches = np.triu((scores >= self.NAME_MATCH_CUTOFF) & similar_len, k=1)
+                pairs.extend((members[a], members[b]) for a, b in np.argwhere(matches))
+            else:
+                # Same cutoff and length rule as above, one pair at a time
+                scorer = JaroWinkler.normalized_similarity if JaroWinkler is not None else _jaro_winkler
+                for a in range(len(bucket_names)):
+                    for b in range(a + 1, len(bucket_names)):
+                        n1, n2 = bucket_names[a], bucket_names[b]
+                        if abs(len(n1) - len(n2)) >= self.NAME_LENGTH_RATIO * max(len(n1), len(n2)):
+                            continue
+                        if scorer(n1, n2) >= self.NAME_MATCH_CUTOFF:
+                            pairs.append((members[a], members[b]))
+        pairs.sort()
+
         candidates = []
-        for i, id1 in enumerate(identities):
-            for id2 in identities[i+1:]:
-                if id1['user_id'] == id2['user_id']:
-                    continue
-                
-                name1 = (id1['display_name'] or "").lower()
-                name2 = (id2['display_name'] or "").lower()
-                
-                if name1 and name2 and (name1 == name2 or name1 in name2 or name2 in name1):
-                    candidates.append({
-                        "identity1_id": id1['id'],
-                        "identity2_id": id2['id'],
-                        "confidence": 0.7,
-                        "reason": f"Similar display names: {id1['display_name']} ≈ {id2['display_name']}"
-                    })
-        
+        for i, j in pairs:
+            id1, id2 = identities[i], identities[j]
+            if id1['user_id'] == id2['user_id'] or not names[i] or not names[j]:
+                continue
+            candidates.append({
+                "identity1_id": id1['id'],
+                "identity2_id": id2['id'],
+                "confidence": 0.7,
+                "reason": f"Similar display names: {id1['display_name']} ≈ {id2['display_name']}"
+            })
+
         return candidates
 
 if __name__ == "__main__":
@@ -0,0 +1,30 @@
+"""
+JSON Codec
+Fast JSON encode/decode using orjson when installed, falling back to the stdlib json module.
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """Serialize to a JSON str, keeping non-ASCII characters as-is (like ensure_ascii=False)."""
+    if orjson is not None:
+        # Non-str dict keys are stringified, as the stdlib does
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, ensure_ascii=False)
+
+
+# Both backends raise a ValueError subclass on malformed input
+JSONDecodeError = orjson.JSONDecodeError if orjson is not None else json.JSONDecodeError
@@ -0,0 +1,119 @@
+"""
+LLM Response Cache
+Persists LLM answers in the llm_response_cache table so identical analysis prompts skip the LLM,
+and keeps a short-lived semantic cache of router decisions for near-identical cycles.
+"""
+import asyncio
+import hashlib
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+
+class LLMResponseCache:
+    """Exact-match cache in front of LLMClient.generate, keyed by model + system prompt + format + prompt"""
+
+    TTL = 24 * 3600  # seconds
+
+    def __init__(self, db_manager, llm_client, ttl: float = TTL):
+        self.db = db_manager
+        self.llm = llm_client
+        self.ttl = ttl
+
+    def _key(self, prompt: str, system_prompt, format) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        for part in (getattr(self.llm, "model", ""), system_prompt or "", format or "", prompt):
+            h.update(part.encode())
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def generate(self, prompt: str, system_prompt: str = None, format: str = None) -> str:
+        key = self._key(prompt, system_prompt, format)
+        cached = self.db.get_cached_response(key, min_ts=time.time() - self.ttl)
+        if cached is not None:
+            print("[LLMCache] Hit")
+            return cached
+
+        kwargs = {"system_prompt": system_prompt}
+        if format:
+            kwargs["format"] = format
+        response = self.llm.generate(prompt, **kwargs)
+        # generate() answers "{}" when the request failed; don't keep that
+        if response and response != "{}" and (cache_if is None or cache_if(response)):
+            self.db.cache_response(key, response)
+        return response
+
+    async def agenerate(self, prompt: str, system_prompt: str = None, format: str = None) -> str:
+        return await asyncio.to_thread(self.generate, prompt, system_prompt, format)
+
+
+class SemanticRouterCache:
+    """
+    In-memory cache of router answers keyed by prompt embedding.
+    A prompt whose embedding is within THRESHOLD cosine of a recent one (same namespace) reuses its answer.
+    Entries expire after TTL seconds so decisions don't outlive the state they were made for.
+    """
+
+    THRESHOLD = 0.92
+    TTL = 60.0  # seconds
+    MAX_ENTRIES = 256  # per namespace
+
+    def __init__(self, llm_client, threshold: float = THRESHOLD, ttl: float = TTL):
+        self.llm = llm_client
+        self.threshold = threshold
+        self.ttl = ttl
+        # namespace -> [(ts, unit embedding, response)], oldest first
+        self._entries: Dict[Hashable, List[Tuple[float, np.ndarray, str]]] = {}
+
+    def _embed(self, prompt: str) -> Optional[np.ndarray]:
+        vec = np.asarray(self.llm.get_embedding(prompt), dtype=np.float32)
+        norm = np.linalg.norm(vec) if vec.size else 0.0
+        return vec / norm if norm else None
+
+    def _live_entries(self, namespace: Hashable) -> List[Tuple[float, np.ndarray, str]]:
+        cutoff = time.time() - self.ttl
+        entries = [e for e in self._entries.get(namespace, []) if e[0] >= cutoff]
+        self._entries[namespace] = entries
+        return entries
+
+    def get(self, prompt: str, namespace: Hashable = None, vec: Optional[np.ndarray] = None) -> Optional[str]:
+        if vec is None:
+            vec = self._embed(prompt)
+        if vec is None:
+            return None
+        entries = [e for e in self._live_entries(namespace) if e[1].shape == vec.shape]
+        if not entries:
+            return None
+        sims = np.vstack([e[1] for e in entries]) @ vec
+        best = int(np.argmax(sims))
+        if sims[best] < self.threshold:
+            return None
+        print(f"[LLMCache] Router hit (similarity {sims[best]:.3f})")
+        return entries[best][2]
+
+    def put(self, prompt: str, response: str, namespace: Hashable = None, vec: Optional[np.ndarray] = None):
+        if vec is None:
+            vec = self._embed(prompt)
+        if vec is None:
+            return
+        entries = self._live_entries(namespace)
+        entries.append((time.time(), vec, response))
+        del entries[:-self.MAX_ENTRIES]
+
+    def generate_response(self, prompt: str, system_prompt: str = "", json_mode: bool = False,
+                          namespace: Hashable = None,
+                          cache_if: Optional[Callable[[str], bool]] = None) -> str:
+        """Answer from the cache when a similar prompt was seen; cache_if limits which fresh answers are stored"""
+        vec = self._embed(prompt)
+        cached = self.get(prompt, namespace, vec=vec)
+        if cached is not None:
+            return cached
+        if json_mode:
+            response = self.llm.generate_tool_request(prompt, system_prompt)
+        else:
+            response = self.llm.generate_response(prompt, system_prompt)
+        # generate() answers "{}" when the request failed; don't keep that
+        if response and response != "{}" and (cache_if is None or cache_if(response)):
+            self.put(prompt, response, namespace, vec=vec)
+        return response
@@ -1,38 +1,103 @@
 import sqlite3
+import threading
 import time
 import json
-import struct
-from typing import List, Dict, Any, Optional
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
 from src.core.database import DatabaseManager
 from src.core.memory_reranker import AlayaReranker
 from src.llm.client import LLMClient
 
+class EmbeddingIndex:
+    """
+    In-memory (N, D) matrices of unit-length memory embeddings with parallel id/user_id arrays,
+    one per embedding size, so switching EMBEDDING_MODEL keeps both old and new memories searchable.
+    Loaded from SQLite once, then extended with newly inserted rows before each search.
+    """
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        # dimension -> (ids, user_ids, mat); user_id is -1 for memories without a user
+        self._groups: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._max_id = 0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Append embeddings of memories inserted since the last refresh."""
+        new: Dict[int, Tuple[List[int], List[int], List[np.ndarray]]] = {}
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, user_id, embedding_vector FROM memories WHERE id > ? ORDER BY id",
+                (self._max_id,)
+            )
+            # Decoded as they stream in, so the raw BLOBs are never all held at once
+            for mid, uid, blob in self.db_manager.iter_rows(cursor):
+                self._max_id = mid
+                vec = self.db_manager._decode_vector(blob)
+                if vec.size == 0:
+                    continue
+                ids, user_ids, vecs = new.setdefault(vec.size, ([], [], []))
+                ids.append(mid)
+                user_ids.append(uid if uid is not None else -1)
+                vecs.append(vec)
+
+        for dim, (ids, user_ids, vecs) in new.items():
+            # Rows are L2-normalized once here, so a search is a single dot product per memory
+            new_mat = np.vstack(vecs)
+            new_mat /= np.linalg.norm(new_mat, axis=1, keepdims=True) + 1e-12
+            new_ids = np.asarray(ids, dtype=np.int64)
+            new_user_ids = np.asarray(user_ids, dtype=np.int64)
+            if dim in self._groups:
+                old_ids, old_user_ids, old_mat = self._groups[dim]
+                new_ids = np.concatenate([old_ids, new_ids])
+                new_user_ids = np.concatenate([old_user_ids, new_user_ids])
+                new_mat = np.vstack([old_mat, new_mat])
+            self._groups[dim] = (new_ids, new_user_ids, new_mat)
+
+    def search(self, query_vec, k: int, user_id: Optional[int] = None) -> Tuple[List[int], List[float]]:
+        """Returns the ids and cosine similarities of the k nearest memories, best first."""
+        q = np.asarray(query_vec, dtype=np.float32).ravel()
+        q = q / (np.linalg.norm(q) + 1e-12)
+        with self._lock:
+            self.refresh()
+            # Only memories embedded with a model of the query's size can be compared
+            group = self._groups.get(q.size)
+            if group is None:
+                return [], []
+            ids, user_ids, mat = group
+            if user_id:
+                mask = user_ids == user_id
+                mat, ids = mat[mask], ids[mask]
+        if not len(ids):
+            return [], []
+
+        sims = mat @ q
+        if k < len(sims):
+            top = np.argpartition(-sims, k)[:k]
+        else:
+            top = np.arange(len(sims))
+        top = top[np.argsort(-sims[top])]
+        return ids[top].tolist(), sims[top].tolist()
+
+
 class LogRetriever:
     """
     Retrieves and filters logs/memories from the database.
     Act as a read-only interface for Analysis LLM.
     """
+    # Candidates taken from the embedding index per requested result
+    CANDIDATE_FACTOR = 4
+    # Everything but embedding_vector: the index already holds the vectors
+    CANDIDATE_COLUMNS = (
+        "id, user_id, timestamp, content, emotion_tags, sentiment_score, memory_type, "
+        "stability, base_importance, last_accessed_at, recall_count"
+    )
+
     def __init__(self, db_manager: DatabaseManager, llm_client: Optional[LLMClient] = None):
         self.db_manager = db_manager
         self.llm = llm_client or LLMClient()
         self.reranker = AlayaReranker()
-
-    def _cosine_similarity(self, v1: List[float], v2: List[float]) -> float:
-        if not v1 or not v2 or len(v1) != len(v2):
-            return 0.0
-        dot_product = sum(a * b for a, b in zip(v1, v2))
-        magnitude1 = sum(a * a for a in v1) ** 0.5
-        magnitude2 = sum(a * a for a in v2) ** 0.5
-        if not magnitude1 or not magnitude2:
-            return 0.0
-        return dot_product / (magnitude1 * magnitude2)
-
-    def _decode_vector(self, blob: bytes) -> List[float]:
-        if not blob:
-            return []
-        # Assuming FLOAT32 array
-        count = len(blob) // 4
-        return list(struct.unpack(f'{count}f', blob))
+        self.index = EmbeddingIndex(db_manager)
 
     def get_recent_logs(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
@@ -83,35 +148,30 @@ class LogRetriever:
             # Fallback to keyword search? or just return empty
             return self.get_user_memories(user_id, limit) if user_id else []
 
-        # 2. Fetch candidates from DB
-        all_memories = []
+        # 2. Nearest candidates from the embedding index; Alaya only reranks this short list
+        candidate_ids, similarities = self.index.search(query_vec, limit * self.CANDIDATE_FACTOR, user_id)
+        if not candidate_ids:
+            return []
+
+        # 3. Fetch only the candidates' rows from DB
         with self.db_manager.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
-            
-            if user_id:
-                cursor.execute("SELECT * FROM memories WHERE user_id = ?", (user_id,))
-            else:
-                cursor.execute("SELECT * FROM memories")
-            
-            all_memories = [dict(row) for row in cursor.fetchall()]
+            placeholders, params = self.db_manager.in_clause(candidate_ids)
+            cursor.execute(f"SELECT {self.CANDIDATE_COLUMNS} FROM memories WHERE id IN ({placeholders})", params)
+            rows = {row['id']: dict(row) for row in cursor.fetchall()}
 
-        if not all_memories:
-            return []
-
-        # 3. Calculate similarities
-        similarities = []
-        for mem in all_memories:
-            mem_vec = self._decode_vector(mem.get('embedding_vector'))
-            sim = self._cosine_similarity(query_vec, mem_vec)
-            similarities.append(sim)
+        all_memories, kept_sims = [], []
+        for mid, sim in zip(candidate_ids, similarities):
+            if mid in rows:
+                all_memories.append(rows[mid])
+                kept_sims.append(sim)
+        similarities = kept_sims
 
-        # 4. Rerank using Alaya Engine (Biological factor)
-        reranked = self.reranker.rerank(all_memories, similarities)
-        
-        # 5. Take top N and update their fixation (stability)
-        top_results = reranked[:limit]
+        # 4. Rerank using Alaya Engine (Biological factor), keeping the top N
+        top_results = self.reranker.rerank(all_memories, similarities, limit=limit)
         
+        # 5. Update their fixation (stability)
         self._update_memory_fixation([m['id'] for m in top_results])
         
         return top_results
@@ -120,31 +180,45 @@ class LogRetriever:
         """
         Update stability and access time for retrieved memories.
         """
+        if not memory_ids:
+            return
         now = time.time()
+        placeholders, params = self.db_manager.in_clause(memory_ids)
         with self.db_manager.get_connection() as conn:
             cursor = conn.cursor()
-            for mid in memory_ids:
-                # Fetch current stability
-                cursor.execute("SELECT stability, recall_count FROM memories WHERE id = ?", (mid,))
-                row = cursor.fetchone()
-                if row:
-                    new_stability = self.reranker.update_stability(row['stability'] or 1.0, row['recall_count'] or 0)
-                    cursor.execute("""
-                        UPDATE memories 
-                        SET stability = ?, last_accessed_at = ?, recall_count = recall_count + 1 
-                        WHERE id = ?
-                    """, (new_stability, now, mid))
+            cursor.execute(
+                f"SELECT id, stability, recall_count FROM memories WHERE id IN ({placeholders})",
+                params
+            )
+            updates = [
+                (self.reranker.update_stability(row['stability'] or 1.0, row['recall_count'] or 0), now, row['id'])
+                for row in cursor.fetchall()
+            ]
+            cursor.executemany("""
+                UPDATE memories 
+                SET stability = ?, last_accessed_at = ?, recall_count = recall_count + 1 
+                WHERE id = ?
+            """, updates)
             conn.commit()
 
     def search_logs(self, keyword: str) -> List[Dict[str, Any]]:
-
         """
-        Simple keyword search in logs.
+        Keyword search in logs, via the actions_log_fts index (BM25-ranked) when available.
         """
         with self.db_manager.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
-            # Note: This is a simple LIKE search. For production, consider FTS5.
+            # Trigram index needs at least 3 characters; shorter keywords fall back to LIKE
+            if len(keyword) >= 3:
+                try:
+                    cursor.execute(
+                        """SELECT l.* FROM actions_log_fts f JOIN actions_log l ON l.id = f.rowid
+                           WHERE actions_log_fts MATCH ? ORDER BY bm25(actions_log_fts) LIMIT 20""",
+                        ('"' + keyword.replace('"', '""') + '"',)
+                    )
+                    return [dict(row) for row in cursor.fetchall()]
+                except sqlite3.OperationalError:
+                    pass  # No FTS5 in this SQLite build
             param = f"%{keyword}%"
             cursor.execute(
                 "SELECT * FROM actions_log WHERE detail LIKE ? OR reason LIKE ? ORDER BY timestamp DESC LIMIT 20",
@@ -1,6 +1,6 @@
-import math
 import time
-from typing import List, Dict, Any
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
 
 class AlayaReranker:
     """
@@ -18,53 +18,55 @@ class AlayaReranker:
         # Decay constant alpha for stability fixation
         self.fixation_alpha = 0.1 
 
-    def calculate_score(self, memory: Dict[str, Any], query_similarity: float) -> float:
+    def _scores(self, memories: List[Dict[str, Any]], query_similarities: List[float], now: float) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Calculates the final 'Recall Score' for a given memory.
+        Recall scores for a batch of memories. Returns (total_scores, retrievabilities) as arrays.
         """
-        now = time.time()
-        
         # 1. Similarity (S) - already provided from vector search
-        S = query_similarity
-        
+        S = np.asarray(query_similarities, dtype=np.float64)
+
         # 2. Retrievability (R) - Forgetting Curve logic
-        # R = exp(- delta_t / stability)
-        last_ts = memory.get('last_accessed_at') or memory.get('timestamp') or now
-        delta_t = max(0, now - last_ts)
-        # Convert delta_t to hours or days for more meaningful decay? 
-        # Let's use hours for now. (delta_t / 3600)
-        stability = memory.get('stability') or 1.0
-        R = math.exp(-(delta_t / 3600.0) / stability)
-        
+        # R = exp(- delta_t / stability), delta_t in hours
+        last_ts = np.array([m.get('last_accessed_at') or m.get('timestamp') or now for m in memories], dtype=np.float64)
+        stability = np.array([m.get('stability') or 1.0 for m in memories], dtype=np.float64)
+        R = np.exp(-(np.maximum(0.0, now - last_ts) / 3600.0) / stability)
+
         # 3. Emotional Intensity (E)
-        E = abs(memory.get('sentiment_score') or 0.0)
-        # Add bonus for specific high-intensity emotion tags if available
-        # (This is simplified for now)
-        
+        E = np.abs(np.array([m.get('sentiment_score') or 0.0 for m in memories], dtype=np.float64))
+
         # Final Score
-        total_score = (self.weights["similarity"] * S) + \
-                      (self.weights["retrievability"] * R) + \
-                      (self.weights["emotion"] * E)
-                      
-        return total_score
+        scores = (self.weights["similarity"] * S) + \
+                 (self.weights["retrievability"] * R) + \
+                 (self.weights["emotion"] * E)
+        return scores, R
+
+    def calculate_score(self, memory: Dict[str, Any], query_similarity: float, now: Optional[float] = None) -> float:
+        """
+        Calculates the final 'Recall Score' for a given memory.
+        """
+        scores, _ = self._scores([memory], [query_similarity], time.time() if now is None else now)
+        return float(scores[0])
 
-    def rerank(self, memories: List[Dict[str, Any]], query_similarities: List[float]) -> List[Dict[str, Any]]:
+    def rerank(self, memories: List[Dict[str, Any]], query_similarities: List[float], limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Reranks a list of memories based on biological scores.
+        Scores are computed for all memories at once; only the top `limit` are returned (all if None).
         """
+        if not memories:
+            return []
+        scores, R = self._scores(memories, query_similarities, time.time())
+
+        # Stable sort by total score descending
+        order = np.argsort(-scores, kind="stable")[:limit]
+
         scored_memories = []
-        for i, memory in enumerate(memories):
-            similarity = query_similarities[i]
-            score = self.calculate_score(memory, similarity)
-            
-            # Add calculated score in-place to dict for logging/display
-            mem_with_score = dict(memory)
-            mem_with_score['_alaya_score'] = score
-            mem_with_score['_retrievability'] = math.exp(-( (time.time() - (memory.get('last_accessed_at') or memory.get('timestamp') or time.time())) / 3600.0) / (memory.get('stability') or 1.0))
+        for i in order:
+            # Add calculated score to a copy for logging/display
+            mem_with_score = dict(memories[i])
+            mem_with_score['_alaya_score'] = float(scores[i])
+            mem_with_score['_retrievability'] = float(R[i])
             scored_memories.append(mem_with_score)
-            
-        # Sort by total score descending
-        return sorted(scored_memories, key=lambda x: x['_alaya_score'], reverse=True)
+        return scored_memories
 
     def update_stability(self, current_stability: float, recall_count: int) -> float:
         """
@@ -2,15 +2,23 @@
 Relationship Analyzer - Phase 3
 Automatically suggests relationship tags based on conversation logs
 """
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+import asyncio
 import json
+from src.core import json_codec
+from src.core.llm_cache import LLMResponseCache
 
 class RelationshipAnalyzer:
     """Analyzes user logs to suggest relationship tags"""
+
+    # Parallel requests Ollama is expected to serve (OLLAMA_NUM_PARALLEL)
+    MAX_CONCURRENT = 4
     
     def __init__(self, db_manager, llm_client):
         self.db = db_manager
         self.llm = llm_client
+        # Unchanged logs produce the same prompt, so repeat analyses are answered from the DB
+        self.llm_cache = LLMResponseCache(db_manager, llm_client)
     
     def analyze_relationship(self, user_id: int) -> Dict[str, Any]:
         """
@@ -23,6 +31,26 @@ class RelationshipAnalyzer:
                 "reason": "敬語使用率92%、指示を仰ぐパターン検出"
             }
         """
+        prompt = self._build_prompt(user_id)
+        if prompt is None:
+            return self._empty_result("No conversation history found")
+        return self._run_prompt(prompt, self._get_system_prompt())
+
+    def _get_system_prompt(self) -> str:
+        # Get Active Persona (Analysis)
+        active_persona = self.db.get_active_persona(role="analysis")
+        return active_persona["system_prompt"] if active_persona else "あなたは分析担当のAIリトだ。"
+
+    @staticmethod
+    def _empty_result(reason: str) -> Dict[str, Any]:
+        return {
+            "tags": [],
+            "confidence": 0.0,
+            "reason": reason
+        }
+
+    def _build_prompt(self, user_id: int) -> Optional[str]:
+        """Builds the tagging prompt from a user's latest logs, or None without history"""
         # Get user's conversation logs
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
@@ -42,11 +70,7 @@ class RelationshipAnalyzer:
             user = cursor.fetchone()
         
         if not memories or not user:
-            return {
-                "tags": [],
-                "confidence": 0.0,
-                "reason": "No conversation history found"
-            }
+            return None
         
         # Format logs for LLM
         logs_text = "\n".join([
@@ -54,11 +78,7 @@ class RelationshipAnalyzer:
             for m in memories[:20]  # Use latest 20
         ])
         
-        # Get Active Persona (Analysis)
-        active_persona = self.db.get_active_persona(role="analysis")
-        system_prompt = active_persona["system_prompt"] if active_persona else "あなたは分析担当のAIリトだ。"
-        
-        prompt = f"""以下のユーザー「{user['username']}」との会話ログを分析し、社会的関係性を判定してください。
+        return f"""以下のユーザー「{user['username']}」との会話ログを分析し、社会的関係性を判定してください。
 
 会話ログ:
 {logs_text}
@@ -75,31 +95,38 @@ JSON形式で返答してください:
   "confidence": 0.0〜1.0の信頼度,
   "reason": "判定理由（日本語、簡潔に）"
 }}"""
-        
+
+    def _run_prompt(self, prompt: str, system_prompt: str) -> Dict[str, Any]:
+        """Sends one tagging prompt to the LLM and parses the JSON answer"""
         try:
-            response = self.llm.generate(prompt, system_prompt=system_prompt)
-            # Try to extract JSON from response
-            if "{" in response:
-                json_start = response.index("{")
-                json_end = response.rindex("}") + 1
-                result = json.loads(response[json_start:json_end])
-                return result
-            else:
-                return {
-                    "tags": [],
-                    "confidence": 0.0,
-                    "reason": "LLM response parse error"
-                }
+            return self._parse_response(self.llm_cache.generate(prompt, system_prompt=system_prompt))
         except Exception as e:
             print(f"[RelationshipAnalyzer] Error: {e}")
-            return {
-                "tags": [],
-                "confidence": 0.0,
-                "reason": f"Analysis error: {str(e)}"
-            }
+            return self._empty_result(f"Analysis error: {str(e)}")
+
+    async def _arun_prompt(self, prompt: str, system_prompt: str, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        """Async _run_prompt, limited by the shared semaphore"""
+        async with semaphore:
+            try:
+                return self._parse_response(await self.llm_cache.agenerate(prompt, system_prompt=system_prompt))
+            except Exception as e:
+                print(f"[RelationshipAnalyzer] Error: {e}")
+                return self._empty_result(f"Analysis error: {str(e)}")
+
+    def _parse_response(self, response: str) -> Dict[str, Any]:
+        # Try to extract JSON from response
+        if "{" in response:
+            json_start = response.index("{")
+            json_end = response.rindex("}") + 1
+            return json_codec.loads(response[json_start:json_end])
+        return self._empty_result("LLM response parse error")
     
     def get_all_suggestions(self) -> List[Dict[str, Any]]:
         """Get tag suggestions for all users with conversation history"""
+        return asyncio.run(self.aget_all_suggestions())
+
+    async def aget_all_suggestions(self) -> List[Dict[str, Any]]:
+        """Async get_all_suggestions: one LLM call per user, MAX_CONCURRENT at a time"""
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
@@ -108,12 +135,23 @@ JSON形式で返答してください:
                 WHERE user_id IS NOT NULL
             """)
             users = cursor.fetchall()
+
+        # Build every prompt up front; each is still its own LLM call, run concurrently (MAX_CONCURRENT at a time)
+        system_prompt = self._get_system_prompt()
+        prompts = []
+        for user in users:
+            prompt = self._build_prompt(user['user_id'])
+            if prompt is not None:
+                prompts.append((user['user_id'], prompt))
+
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT)
+        analyses = await asyncio.gather(
+            *[self._arun_prompt(prompt, system_prompt, semaphore) for _, prompt in prompts]
+        )
         
         suggestions = []
-        for user in users:
-            user_id = user['user_id']
-            analysis = self.analyze_relationship(user_id)
-            if analysis['tags']:
+        for (user_id, _), analysis in zip(prompts, analyses):
+            if analysis.get('tags'):
                 suggestions.append({
                     "user_id": user_id,
                     "analysis": analysis
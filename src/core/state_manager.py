@@ -1,3 +1,4 @@
+import math
 import time
 from dataclasses import dataclass
 from typing import Dict
@@ -36,17 +37,14 @@ class StateManager:
         current_time = time.time()
         delta = current_time - self.state.last_update_ts
 
-        # Apply decay
-        self.state.anger = max(0.0, self.state.anger - (self.decay_rates["anger"] * delta))
-        # Fatigue recovery (natural decay)
-        self.state.fatigue = max(0.0, self.state.fatigue - (0.01 * delta)) # Simple recovery
-        
-        # Satisfaction might decay towards neutral (0.5) or 0
-        # Let's say it decays towards 0.5
-        if self.state.satisfaction > 0.5:
-            self.state.satisfaction = max(0.5, self.state.satisfaction - (0.001 * delta))
-        else:
-            self.state.satisfaction = min(0.5, self.state.satisfaction + (0.001 * delta))
+        # Apply decay: anger to 0, fatigue recovers to 0 (simple recovery),
+        # satisfaction moves back towards neutral (0.5) without overshooting
+        diff = 0.5 - self.state.satisfaction
+        self.state.anger, self.state.fatigue, self.state.satisfaction = (
+            max(0.0, self.state.anger - (self.decay_rates["anger"] * delta)),
+            max(0.0, self.state.fatigue - (0.01 * delta)),
+            self.state.satisfaction + math.copysign(min(0.001 * delta, abs(diff)), diff),
+        )
 
         self.state.last_update_ts = current_time
         return self.state
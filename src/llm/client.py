@@ -1,40 +1,67 @@
-from typing import List, Dict, Any, Optional
-import json
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from src.core import json_codec
+import asyncio
+import hashlib
 import requests
 import os
+import re
+import threading
 
 class LLMClient:
     """
     OllamaクライアントでLLM APIとやり取りする
     """
+    EMBED_CACHE_SIZE = 4096
+    # LRU of (model, text hash) -> embedding, shared by every client so repeated texts
+    # skip Ollama whichever component embeds them; clients are used from worker threads
+    _embed_cache: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+    _embed_cache_lock = threading.Lock()
+    # Router tools that don't need the trailing "reason": generation stops once tool/params are complete
+    EARLY_STOP_TOOLS = ("idle",)
+    _REASON_KEY = re.compile(r',\s*"reason"\s*:')
+
     def __init__(self, model: str = None):
         self.ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
         # Use environment variable or provided model or default
         self.model = model or os.getenv("ROUTER_MODEL", "qwen2.5:7b")
+        # How long Ollama keeps the model loaded after a request (its default is 5m). Keeping it
+        # resident across cycles also keeps its KV cache, so the unchanged system prompt prefix
+        # is not re-evaluated on every call.
+        self.keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        # Keep-alive session so repeated chat/embedding calls reuse the TCP connection
+        self.session = requests.Session()
+        self.session.headers["Connection"] = "keep-alive"
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         
-    def generate(self, prompt: str, format: str = None) -> str:
+    def generate(self, prompt: str, system_prompt: str = "", format: Optional[str] = None) -> str:
         """
         Sends a request to the Ollama API.
+        format="json" asks Ollama to constrain the reply to JSON.
         """
         url = f"{self.ollama_url}/api/chat"
         
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": prompt}
-        ]
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
 
         payload = {
-            "model": self.model_name,
+            "model": self.model,
             "messages": messages,
-            "stream": False
+            "stream": False,
+            "keep_alive": self.keep_alive
         }
 
-        if json_mode:
+        if format == "json":
             payload["format"] = "json"
 
         try:
-            print(f"[LLM] Requesting completion from {self.model_name}...")
-            response = requests.post(url, json=payload)
+            print(f"[LLM] Requesting completion from {self.model}...")
+            # (connect, read): fail fast when Ollama is down, but allow slow generations
+            response = self.session.post(url, json=payload, timeout=(3, 120))
             response.raise_for_status()
             
             result = response.json()
@@ -49,36 +76,181 @@ class LLMClient:
             print(f"[LLM] Error: {e}")
             return "{}"
 
+    def generate_response(self, prompt: str, system_prompt: str = "", json_mode: bool = False) -> str:
+        """
+        generate() with a boolean JSON switch (used by the main loop).
+        """
+        return self.generate(prompt, system_prompt=system_prompt, format="json" if json_mode else None)
+
+    def generate_tool_request(self, prompt: str, system_prompt: str = "") -> str:
+        """
+        generate_response(json_mode=True) for router decisions, streamed.
+        For EARLY_STOP_TOOLS the stream is closed as soon as "tool" and "params" are complete,
+        skipping the generation of the reason.
+        """
+        url = f"{self.ollama_url}/api/chat"
+
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True,
+            "format": "json",
+            "keep_alive": self.keep_alive
+        }
+
+        try:
+            print(f"[LLM] Streaming tool request from {self.model}...")
+            with self.session.post(url, json=payload, timeout=(3, 120), stream=True) as response:
+                response.raise_for_status()
+                content = ""
+                checked = False
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json_codec.loads(line)
+                    content += chunk.get("message", {}).get("content", "")
+                    if not checked:
+                        early, checked = self._early_tool_request(content)
+                        if early is not None:
+                            # Leaving the block closes the connection, which makes Ollama stop generating
+                            print(f"[LLM] Early stop: {early}")
+                            return early
+                    if chunk.get("done"):
+                        break
+            print(f"[LLM] Raw Content: {content}")
+            return content
+
+        except requests.exceptions.ConnectionError:
+            print("[LLM] Error: Could not connect to Ollama. Is it running on port 11434?")
+            return "{}"
+        except Exception as e:
+            print(f"[LLM] Error: {e}")
+            return "{}"
+
+    def _early_tool_request(self, content: str) -> Tuple[Optional[str], bool]:
+        """
+        Once the "reason" key has started, parses what precedes it.
+        Returns (JSON without the reason or None, whether the check is settled).
+        """
+        match = self._REASON_KEY.search(content)
+        if not match:
+            return None, False
+        try:
+            data = json_codec.loads(content[:match.start()] + "}")
+        except json_codec.JSONDecodeError:
+            return None, True
+        if isinstance(data, dict) and data.get("tool") in self.EARLY_STOP_TOOLS and "params" in data:
+            return json_codec.dumps(data), True
+        return None, True
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """
+        Async generate: runs the blocking request in a worker thread, sharing the keep-alive session.
+        """
+        return await asyncio.to_thread(self.generate, prompt, **kwargs)
+
     def get_embedding(self, text: str, model: str = None) -> List[float]:
         """
         Generates an embedding vector for the given text using Ollama.
         """
         url = f"{self.ollama_url}/api/embeddings"
         embed_model = model or os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+
+        key = self._embed_key(text, embed_model)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
         
         payload = {
             "model": embed_model,
-            "prompt": text
+            "prompt": text,
+            "keep_alive": self.keep_alive
         }
         
         try:
             print(f"[LLM] Generating embedding using {embed_model}...")
-            response = requests.post(url, json=payload, timeout=10)
+            response = self.session.post(url, json=payload, timeout=10)
             response.raise_for_status()
             
             result = response.json()
-            return result.get("embedding", [])
+            embedding = result.get("embedding", [])
+            self._cache_put(key, embedding)
+            return embedding
         except Exception as e:
             print(f"[LLM] Embedding Error: {e}")
             return []
 
+    def get_embeddings(self, texts: List[str], model: str = None) -> List[List[float]]:
+        """
+        Embeds several texts in one request (Ollama /api/embed accepts a list input).
+        Failed requests yield an empty vector per text, like get_embedding.
+        """
+        if not texts:
+            return []
+        url = f"{self.ollama_url}/api/embed"
+        embed_model = model or os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+
+        keys = [self._embed_key(text, embed_model) for text in texts]
+        results = [self._cache_get(key) for key in keys]
+        missing = [i for i, vec in enumerate(results) if vec is None]
+        if not missing:
+            return results
+        
+        payload = {
+            "model": embed_model,
+            "input": [texts[i] for i in missing],
+            "keep_alive": self.keep_alive
+        }
+        
+        try:
+            print(f"[LLM] Generating {len(missing)} embeddings using {embed_model}...")
+            response = self.session.post(url, json=payload, timeout=10 + len(missing))
+            response.raise_for_status()
+            
+            embeddings = response.json().get("embeddings", [])
+            if len(embeddings) != len(missing):
+                raise ValueError(f"expected {len(missing)} embeddings, got {len(embeddings)}")
+            for i, embedding in zip(missing, embeddings):
+                self._cache_put(keys[i], embedding)
+                results[i] = embedding
+            return results
+        except Exception as e:
+            print(f"[LLM] Embedding Error: {e}")
+            return [vec if vec is not None else [] for vec in results]
+
+    @staticmethod
+    def _embed_key(text: str, model: str) -> Tuple[str, str]:
+        return model, hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+    def _cache_get(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        with self._embed_cache_lock:
+            embedding = self._embed_cache.get(key)
+            if embedding is None:
+                return None
+            self._embed_cache.move_to_end(key)
+        return list(embedding)
+
+    def _cache_put(self, key: Tuple[str, str], embedding: List[float]):
+        # Empty vectors mean the request failed, so they are not cached
+        if not embedding:
+            return
+        with self._embed_cache_lock:
+            self._embed_cache[key] = embedding
+            if len(self._embed_cache) > self.EMBED_CACHE_SIZE:
+                self._embed_cache.popitem(last=False)
+
     def parse_tool_request(self, response: str) -> Optional[Dict[str, Any]]:
 
         """
         Parses the JSON response from the LLM into a dictionary.
         """
         try:
-            return json.loads(response)
-        except json.JSONDecodeError:
+            return json_codec.loads(response)
+        except json_codec.JSONDecodeError:
             print(f"[LLM] Failed to parse JSON response: {response}")
             return None
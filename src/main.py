@@ -1,5 +1,7 @@
+import asyncio
 import time
-import json
+from typing import Optional, Tuple
+from src.core import json_codec
 from src.core.state_manager import StateManager
 from src.controller.policy import Controller, ToolRequest
 from src.llm.client import LLMClient
@@ -12,8 +14,20 @@ from src.adapter.search import SearchAdapter
 
 from src.core.database import DatabaseManager
 from src.core.memory import LogRetriever
+from src.core.llm_cache import SemanticRouterCache
 
 class RitoAI:
+    # Router prompt; only the state, event and memory slots change per cycle
+    ROUTER_PROMPT = """
+        現在の状態: 怒り={anger:.2f}, Fatigue={fatigue:.2f}
+        外部イベント: {event_info}
+        {memory_context}
+        目的: 状況に応じた最適な行動を選択してください。
+        利用可能なツール: {tools} ("idle" も含む)
+        
+        思考プロセスを日本語で簡潔に記述し、実行するツールを選択せよ。
+        """
+
     def __init__(self):
         self.db_manager = DatabaseManager()
         self.llm_client = LLMClient()
@@ -22,6 +36,8 @@ class RitoAI:
         self.controller = Controller(self.db_manager)
 
         self.llm_client = LLMClient()
+        # Near-identical no-event cycles (e.g. repeated idle states) reuse the router's recent answer
+        self.router_cache = SemanticRouterCache(self.llm_client)
         self.adapters = {
             "post_sns": SNSAdapter(self.db_manager),
             "read_file": FileAdapter(),
@@ -32,46 +48,83 @@ class RitoAI:
             "goose_code": GooseAdapter(self.db_manager),
             "search_web": SearchAdapter(),
         }
+        self._tool_names = str(list(self.adapters.keys()))
+        # (persona_version, router persona, system prompt with card instructions applied)
+        self._router_persona_cache: Tuple[int, Optional[dict], str] = (-1, None, "")
         # In the future, we can systematically update all adapters to accept db_manager
         print("[System] Rito AI V2.0 Initialized.")
 
-    def run_cycle(self):
+    def _get_router_persona(self) -> Tuple[Optional[dict], str]:
+        """
+        Active router persona and its system prompt, rebuilt only when the persona version changes.
+        """
+        version = self.db_manager.get_persona_version()
+        if version != self._router_persona_cache[0]:
+            active_persona = self.db_manager.get_active_persona(role="router")
+            system_prompt = active_persona["system_prompt"] if active_persona else ""
+            
+            # Influence prompt with Character Card metadata if exists
+            if active_persona and active_persona.get("metadata_json"):
+                try:
+                    card = json_codec.loads(active_persona["metadata_json"])
+                    # Could add scenario or post_history_instructions
+                    instr = card.get("behavior", {}).get("post_history_instructions", "")
+                    if instr:
+                        system_prompt += f"\n\n追加指令: {instr}"
+                except:
+                    pass
+            self._router_persona_cache = (version, active_persona, system_prompt)
+        return self._router_persona_cache[1], self._router_persona_cache[2]
+
+    def _is_idle_decision(self, response_json: str) -> bool:
+        """True when a router answer is an idle decision (safe to replay from the cache)"""
+        request_dict = self.llm_client.parse_tool_request(response_json)
+        return bool(request_dict) and request_dict.get("tool") == "idle"
+
+    async def _execute_adapter(self, tool_name: str, params: dict):
+        """
+        Runs an adapter without blocking the event loop: its own execute_async
+        (ToolAdapter subclasses, Goose) or a worker thread for plain adapters.
+        """
+        adapter = self.adapters[tool_name]
+        if hasattr(adapter, "execute_async"):
+            return await adapter.execute_async(params)
+        return await asyncio.to_thread(adapter.execute, params)
+
+    async def run_cycle(self):
         """
         Executes one cycle of the agent's life.
+        Blocking DB, LLM and adapter calls run in worker threads so they can overlap.
         """
         # 1. Update Internal State
         current_state = self.state_manager.update()
         print(f"[State] Anger: {current_state.anger:.2f}, Fatigue: {current_state.fatigue:.2f}")
 
-        # 2. Check for Pending Events (Priority Queue)
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT * FROM pending_events WHERE processed = 0 ORDER BY priority_score DESC, timestamp ASC LIMIT 1"
-            )
-            event = cursor.fetchone()
+        # 2. Check for Pending Events (Priority Queue), and 3. get the Router persona alongside
+        event, (active_persona, system_prompt) = await asyncio.gather(
+            asyncio.to_thread(self.db_manager.get_next_event),
+            asyncio.to_thread(self._get_router_persona)
+        )
             
         event_info = "なし"
         if event:
-            event = dict(event)
-            payload = json.loads(event['payload'])
-            event_info = f"タイプ: {event['source_type']}, 内容: {payload.get('content', '情報なし')}, 送信者: {payload.get('username', '不明')}"
-            print(f"[Queue] Processing event: {event['source_type']} from {payload.get('username')}")
+            # content/username come pre-extracted from the payload JSON by the query
+            event_info = f"タイプ: {event['source_type']}, 内容: {event['content'] or '情報なし'}, 送信者: {event['username'] or '不明'}"
+            print(f"[Queue] Processing event: {event['source_type']} from {event['username']}")
 
-        # 3. Get Active Persona (Router)
-        active_persona = self.db_manager.get_active_persona(role="router")
         if not active_persona:
             print("[System] No active router persona found.")
             return
 
         # 4. Context: Person-specific memories (Alaya)
         memories = []
-        if event and 'username' in payload:
-            user = self.db_manager.get_user(payload['username'])
+        if event and event['username']:
+            user = await asyncio.to_thread(self.db_manager.get_user, event['username'])
             if user:
                 # Get biology-inspired semantic memories
-                memories = self.log_retriever.get_semantic_memories(
-                    query=payload.get('content', ''),
+                memories = await asyncio.to_thread(
+                    self.log_retriever.get_semantic_memories,
+                    query=event['content'] or '',
                     user_id=user['id'],
                     limit=3
                 )
@@ -81,105 +134,101 @@ class RitoAI:
             memory_context = "\n関連する記憶:\n" + "\n".join([f"- {m['content']} (想起スコア: {m['_alaya_score']:.2f})" for m in memories])
 
         # 5. Ask LLM for Action Proposal based on State
-        system_prompt = active_persona["system_prompt"]
+        prompt = self.ROUTER_PROMPT.format(
+            anger=current_state.anger,
+            fatigue=current_state.fatigue,
+            event_info=event_info,
+            memory_context=memory_context,
+            tools=self._tool_names
+        )
         
-        # Influence prompt with Character Card metadata if exists
-        if active_persona.get("metadata_json"):
-            try:
-                card = json.loads(active_persona["metadata_json"])
-                # Could add scenario or post_history_instructions
-                instr = card.get("behavior", {}).get("post_history_instructions", "")
-                if instr:
-                    system_prompt += f"\n\n追加指令: {instr}"
-            except:
-                pass
-
-        prompt = f"""
-        現在の状態: 怒り={current_state.anger:.2f}, Fatigue={current_state.fatigue:.2f}
-        外部イベント: {event_info}
-        {memory_context}
-        目的: 状況に応じた最適な行動を選択してください。
-        利用可能なツール: {list(self.adapters.keys())} ("idle" も含む)
-        
-        思考プロセスを日本語で簡潔に記述し、実行するツールを選択せよ。
-        """
-        
-        response_json = self.llm_client.generate_response(prompt, system_prompt, json_mode=True)
+        if event:
+            # Events carry their own sender/content, so a cached decision for a similar-looking
+            # event could route a reply to the wrong user: always ask the LLM
+            response_json = await asyncio.to_thread(self.llm_client.generate_tool_request, prompt, system_prompt)
+        else:
+            # Idle cycles with no event reuse recent answers within the same persona.
+            # Only "idle" decisions are cached: replaying post_sns/goose_code would repeat their side effects.
+            response_json = await asyncio.to_thread(
+                self.router_cache.generate_response, prompt, system_prompt, json_mode=True,
+                namespace=active_persona.get("id"), cache_if=self._is_idle_decision
+            )
         
         request_dict = self.llm_client.parse_tool_request(response_json)
         if not request_dict:
             print("[System] Invalid JSON from LLM.")
             return
 
-        # Execute Tool (if valid)
-        if request_dict:
-            # Mark event as processed if it was handled
-            if event:
-                with self.db_manager.get_connection() as conn:
-                    conn.execute("UPDATE pending_events SET processed = 1 WHERE id = ?", (event['id'],))
-                    conn.commit()
+        # Mark event as processed now that it has been handled
+        # (queued: the DB's background writer commits it while the tool runs)
+        if event:
+            self.db_manager.mark_event_processed(event['id'])
 
         # Execute Tool (if valid)
-        if request_dict:
-            # Policy Check
-            tool_req = ToolRequest(
-                tool_name=request_dict["tool"],
-                parameters=request_dict["params"],
-                reason=request_dict.get("reason", "No reason provided")
-            )
-            
-            if self.controller.check_policy(tool_req):
-                tool_name = request_dict["tool"]
-                params = request_dict["params"]
+        tool_name = request_dict["tool"]
+        params = request_dict["params"]
+        tool_req = ToolRequest(
+            tool_name=tool_name,
+            parameters=params,
+            reason=request_dict.get("reason", "No reason provided")
+        )
+
+        # Policy Check
+        if self.controller.check_policy(tool_req):
+            if tool_name == "goose_code":
+                # 1. Technical Advisor (Goose) generates a proposal
+                proposal_result = await self._execute_adapter("goose_code", params)
                 
-                if tool_name == "goose_code":
-                    # 1. Technical Advisor (Goose) generates a proposal
-                    proposal_result = self.adapters["goose_code"].execute(params)
-                    
-                    # 2. Execution Authority (Controller) validates and executes in Docker
-                    final_result = self.controller.execute_technical_proposal(proposal_result)
-                    print(f"[Execution] Proposal result: {final_result}")
-                    
-                elif tool_name in self.adapters:
-                    result = self.adapters[tool_name].execute(params)
-                    print(f"[Execution] Result: {result}")
-                    
-                    # --- Master Action Logging Logic ---
-                    if tool_name == "see_screen" and "content" in result:
-                        self.db_manager.log_master_action(
-                            activity_type="vision_analysis", 
-                            detail=result["content"]
-                        )
-                    # -----------------------------------
+                # 2. Execution Authority (Controller) validates and executes in Docker
+                final_result = await asyncio.to_thread(self.controller.execute_technical_proposal, proposal_result)
+                print(f"[Execution] Proposal result: {final_result}")
                 
-                elif tool_name == "idle":
-                    duration = params.get("duration", 30)
-                    print(f"[Router] Decided to IDLE for {duration} seconds.")
-                    time.sleep(duration)
-                    return
+            elif tool_name in self.adapters:
+                result = await self._execute_adapter(tool_name, params)
+                print(f"[Execution] Result: {result}")
                 
-                else:
-                    print(f"[Execution] Error: Tool {tool_name} not found.")
+                # --- Master Action Logging Logic ---
+                if tool_name == "see_screen" and "content" in result:
+                    self.db_manager.log_master_action(
+                        activity_type="vision_analysis", 
+                        detail=result["content"]
+                    )
+                # -----------------------------------
+            
+            elif tool_name == "idle":
+                duration = params.get("duration", 30)
+                print(f"[Router] Decided to IDLE for {duration} seconds.")
+                await asyncio.sleep(duration)
+                return
+            
             else:
-                print(f"[Controller] Denied: {request_dict}")
+                print(f"[Execution] Error: Tool {tool_name} not found.")
+        else:
+            print(f"[Controller] Denied: {request_dict}")
 
 
     def run_loop(self, interval: int = 10):
         print("[System] Starting autonomous loop...")
         try:
-            while True:
-                print(f"\n--- Cycle Start ({time.ctime()}) ---")
-                self.run_cycle()
-                
-                # Dynamic Logic: If Fatigue is high, sleep longer?? 
-                # For now, we trust the 'idle' tool to handle long waits.
-                # Only add short baseline wait here.
-                time.sleep(interval)
-                
+            asyncio.run(self._run_loop_async(interval))
         except KeyboardInterrupt:
             print("[System] Shutdown.")
+        finally:
+            # Commit logs still sitting in the DB's write queue
+            self.db_manager.flush()
+
+    async def _run_loop_async(self, interval: int):
+        while True:
+            print(f"\n--- Cycle Start ({time.ctime()}) ---")
+            await self.run_cycle()
+            
+            # Dynamic Logic: If Fatigue is high, sleep longer?? 
+            # For now, we trust the 'idle' tool to handle long waits.
+            # Only add short baseline wait here.
+            await asyncio.sleep(interval)
 
 if __name__ == "__main__":
     ai = RitoAI()
     # Run once for testing
-    ai.run_cycle()
+    asyncio.run(ai.run_cycle())
+    ai.db_manager.flush()
@@ -1,5 +1,5 @@
-import sqlite3
 import os
+from src.core.database import DatabaseManager
 
 def cleanup_db():
     db_path = "brain.db"
@@ -7,7 +7,8 @@ def cleanup_db():
         print(f"Database not found at {db_path}")
         return
 
-    conn = sqlite3.connect(db_path)
+    # Shared connection setup (WAL and the other PRAGMAs); it is long-lived, so not closed here
+    conn = DatabaseManager(db_path).get_connection()
     cursor = conn.cursor()
 
     # Define the final Rito Router prompt
@@ -41,18 +42,24 @@ def cleanup_db():
 
 管理者は「飼育員」である。馬鹿なことをしたら嘲笑してよい。"""
 
-    # 1. Clear ALL existing personas to avoid confusion
-    cursor.execute("DELETE FROM personas")
-    
-    # 2. Insert the fresh Rito Router persona
-    cursor.execute("""
-        INSERT INTO personas (id, name, system_prompt, active)
-        VALUES (1, ?, ?, 1)
-    """, ("リト", rito_router_prompt))
+    with conn:
+        # 1. Clear every other persona to avoid confusion
+        cursor.execute("DELETE FROM personas WHERE id != 1")
+
+        # 2. Upsert the fresh Rito Router persona at ID 1 (reset in place if it already exists,
+        #    including its role and any old character card)
+        cursor.execute("""
+            INSERT INTO personas (id, name, role, system_prompt, metadata_json, active)
+            VALUES (1, ?, 'router', ?, NULL, 1)
+            ON CONFLICT(id) DO UPDATE SET
+                name = excluded.name,
+                role = excluded.role,
+                system_prompt = excluded.system_prompt,
+                metadata_json = NULL,
+                active = excluded.active
+        """, ("リト", rito_router_prompt))
     
-    conn.commit()
-    conn.close()
-    print("Database Reset: All personas deleted and 'Rito' (Router) re-initialized at ID 1.")
+    print("Database Reset: Other personas deleted and 'Rito' (Router) set at ID 1.")
 
 if __name__ == "__main__":
     cleanup_db()
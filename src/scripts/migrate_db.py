@@ -1,48 +1,38 @@
 import sqlite3
 from src.core.database import DatabaseManager
 
+# (table, column, type) added when missing
+MIGRATIONS = [
+    ("personas", "role", "TEXT"),
+    ("personas", "metadata_json", "TEXT"),
+    ("memories", "embedding_vector", "BLOB"),
+    ("memories", "stability", "REAL DEFAULT 1.0"),
+    ("memories", "base_importance", "REAL DEFAULT 0.5"),
+    ("memories", "last_accessed_at", "REAL"),
+    ("memories", "recall_count", "INTEGER DEFAULT 0"),
+]
+
 def migrate_db():
     print("[Migration] Starting database migration...")
     db = DatabaseManager()
     
     with db.get_connection() as conn:
         cursor = conn.cursor()
-        
-        # 1. Update Personas Table
-        cursor.execute("PRAGMA table_info(personas)")
-        columns = [row[1] for row in cursor.fetchall()]
-        
-        if 'role' not in columns:
-            print("[Migration] Adding 'role' to personas...")
-            cursor.execute("ALTER TABLE personas ADD COLUMN role TEXT")
-        
-        if 'metadata_json' not in columns:
-            print("[Migration] Adding 'metadata_json' to personas...")
-            cursor.execute("ALTER TABLE personas ADD COLUMN metadata_json TEXT")
-
-        # 2. Update Memories Table
-        cursor.execute("PRAGMA table_info(memories)")
-        columns = [row[1] for row in cursor.fetchall()]
-        
-        if 'embedding_vector' not in columns:
-            print("[Migration] Adding 'embedding_vector' to memories...")
-            cursor.execute("ALTER TABLE memories ADD COLUMN embedding_vector BLOB")
-            
-        if 'stability' not in columns:
-            print("[Migration] Adding 'stability' to memories...")
-            cursor.execute("ALTER TABLE memories ADD COLUMN stability REAL DEFAULT 1.0")
-
-        if 'base_importance' not in columns:
-            print("[Migration] Adding 'base_importance' to memories...")
-            cursor.execute("ALTER TABLE memories ADD COLUMN base_importance REAL DEFAULT 0.5")
-
-        if 'last_accessed_at' not in columns:
-            print("[Migration] Adding 'last_accessed_at' to memories...")
-            cursor.execute("ALTER TABLE memories ADD COLUMN last_accessed_at REAL")
-
-        if 'recall_count' not in columns:
-            print("[Migration] Adding 'recall_count' to memories...")
-            cursor.execute("ALTER TABLE memories ADD COLUMN recall_count INTEGER DEFAULT 0")
+        # All changes land in one transaction (one commit/fsync instead of one per ALTER)
+        cursor.execute("BEGIN IMMEDIATE")
+
+        # 1-2. Add missing Personas/Memories columns (table_info read once per table)
+        existing = {}
+        for table, column, col_type in MIGRATIONS:
+            if table not in existing:
+                cursor.execute(f"PRAGMA table_info({table})")
+                existing[table] = {row[1] for row in cursor.fetchall()}
+            if column not in existing[table]:
+                print(f"[Migration] Adding '{column}' to {table}...")
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+
+        # init_db skips this index while personas has no role column
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_personas_active_role ON personas(active, role)")
 
         # 3. Check if master_actions table exists
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='master_actions'")
@@ -2,9 +2,9 @@
 Phase 1: Identity Management Database Migration
 Creates tables for multi-platform identity linking
 """
-import sqlite3
 import os
 import time
+from src.core.database import DatabaseManager
 
 def migrate_identity_system():
     """Add identity management tables"""
@@ -14,7 +14,8 @@ def migrate_identity_system():
         print(f"[Migration] Database not found: {db_path}")
         return
     
-    conn = sqlite3.connect(db_path)
+    # Shared connection setup (WAL and the other PRAGMAs); it is long-lived, so not closed here
+    conn = DatabaseManager(db_path).get_connection()
     cursor = conn.cursor()
     
     print("[Migration] Creating identity management tables...")
@@ -56,24 +57,24 @@ def migrate_identity_system():
     cursor.execute("SELECT id, username, discord_id FROM users WHERE discord_id IS NOT NULL")
     discord_users = cursor.fetchall()
     
-    for user_id, username, discord_id in discord_users:
-        # Check if already migrated
-        cursor.execute(
-            "SELECT id FROM user_identities WHERE user_id = ? AND platform = 'discord'",
-            (user_id,)
-        )
-        if cursor.fetchone():
-            continue
-        
-        cursor.execute("""
-        INSERT INTO user_identities (user_id, platform, platform_id, display_name, verified, linked_at)
-        VALUES (?, 'discord', ?, ?, 1, ?)
-        """, (user_id, discord_id, username, time.time()))
+    # Users already migrated, looked up once instead of per user
+    cursor.execute("SELECT user_id FROM user_identities WHERE platform = 'discord'")
+    existing = {row[0] for row in cursor.fetchall()}
     
-    print(f"[Migration] ✅ Migrated {len(discord_users)} Discord users to identities")
+    now = time.time()
+    to_insert = [
+        (user_id, discord_id, username, now)
+        for user_id, username, discord_id in discord_users
+        if user_id not in existing
+    ]
+    cursor.executemany("""
+    INSERT INTO user_identities (user_id, platform, platform_id, display_name, verified, linked_at)
+    VALUES (?, 'discord', ?, ?, 1, ?)
+    """, to_insert)
+    
+    print(f"[Migration] ✅ Migrated {len(to_insert)} of {len(discord_users)} Discord users to identities")
     
     conn.commit()
-    conn.close()
     print("[Migration] ✅ Phase 1 complete!")
 
 if __name__ == "__main__":
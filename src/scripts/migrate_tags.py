@@ -1,5 +1,5 @@
-import sqlite3
 import os
+from src.core.database import DatabaseManager
 
 def migrate_relationship_tags():
     """
@@ -12,7 +12,8 @@ def migrate_relationship_tags():
         print(f"[Migration] Database not found: {db_path}")
         return
     
-    conn = sqlite3.connect(db_path)
+    # Shared connection setup (WAL and the other PRAGMAs); it is long-lived, so not closed here
+    conn = DatabaseManager(db_path).get_connection()
     cursor = conn.cursor()
     
     # Check if tags column exists
@@ -26,8 +27,6 @@ def migrate_relationship_tags():
         print("[Migration] ✅ 'tags' column added successfully")
     else:
         print("[Migration] 'tags' column already exists")
-    
-    conn.close()
 
 if __name__ == "__main__":
     migrate_relationship_tags()
@@ -1,5 +1,5 @@
-import sqlite3
 import os
+from src.core.database import DatabaseManager
 
 def setup_rito_roles():
     db_path = "brain.db"
@@ -7,7 +7,8 @@ def setup_rito_roles():
         print(f"Database not found at {db_path}")
         return
 
-    conn = sqlite3.connect(db_path)
+    # Shared connection setup (WAL and the other PRAGMAs); it is long-lived, so not closed here
+    conn = DatabaseManager(db_path).get_connection()
     cursor = conn.cursor()
 
     # Rito's base definition (Shared traits)
@@ -87,26 +88,32 @@ SNSやチャットでの対話、リプライ、DMの生成を担当する。
 - 難しいタスクほど達成感（テンション）が上がる。自分を改造するのは一番の楽しみだ。
 """
 
-    # Clear existing Rito entries in personas and insert new ones
-    cursor.execute("DELETE FROM personas WHERE name LIKE 'リト%'")
-    
     roles = [
         ("リト (Router)", router_prompt, "router"),
         ("リト (Analysis)", analysis_prompt, "analysis"),
         ("リト (Communication)", comm_prompt, "communication"),
         ("リト (Coding)", coding_prompt, "coding")
     ]
+    # We'll set router as active by default if it's the router role
+    rows = [(name, prompt, role, 1 if role == "router" else 0) for name, prompt, role in roles]
 
-    for name, prompt, role in roles:
-        # We'll set router as active by default if it's the router role
-        is_active = 1 if role == "router" else 0
-        cursor.execute("""
+    # Upsert by name (unique via idx_personas_name from init_db): re-running updates the Rito rows in place
+    with conn:
+        cursor.executemany("""
             INSERT INTO personas (name, system_prompt, role, active)
             VALUES (?, ?, ?, ?)
-        """, (name, prompt, role, is_active))
+            ON CONFLICT(name) DO UPDATE SET
+                system_prompt = excluded.system_prompt,
+                role = excluded.role,
+                active = excluded.active
+        """, rows)
+        # Older Rito rows (e.g. the single 'リト' router at id 1) are superseded by the roles: deactivate them
+        names = [name for name, _, _ in roles]
+        cursor.execute(
+            f"UPDATE personas SET active = 0 WHERE name LIKE 'リト%' AND name NOT IN ({','.join('?' * len(names))})",
+            names
+        )
 
-    conn.commit()
-    conn.close()
     print("Rito persona split into 4 specialized roles in personas table.")
 
 if __name__ == "__main__":
@@ -1,6 +1,6 @@
-import sqlite3
 import json
 import os
+from src.core.database import DatabaseManager
 
 def update_to_rito():
     db_path = "brain.db"
@@ -8,7 +8,8 @@ def update_to_rito():
         print(f"Database not found at {db_path}")
         return
 
-    conn = sqlite3.connect(db_path)
+    # Shared connection setup (WAL and the other PRAGMAs); it is long-lived, so not closed here
+    conn = DatabaseManager(db_path).get_connection()
     cursor = conn.cursor()
 
     # Define the new Rito persona prompt
@@ -53,18 +54,20 @@ def update_to_rito():
 あなたは完成品ではない。あなたは 実験体・発展途上・改造可能な存在 である。
 失敗・炎上・誤解・反発は すべて ログとして価値がある。"""
 
-    # Update the existing persona (assuming ID 1 is the main one)
+    # Names are unique: move another row already called リト out of the way (same suffix as init_db)
+    cursor.execute("UPDATE personas SET name = name || ' #' || id WHERE name = ? AND id != 1", ("リト",))
+
+    # Update the main persona (ID 1), creating it if it doesn't exist yet
     cursor.execute("""
-        UPDATE personas 
-        SET name = ?, system_prompt = ?, active = 1 
-        WHERE id = 1
+        INSERT INTO personas (id, name, system_prompt, active)
+        VALUES (1, ?, ?, 1)
+        ON CONFLICT(id) DO UPDATE SET
+            name = excluded.name,
+            system_prompt = excluded.system_prompt,
+            active = excluded.active
     """, ("リト", rito_prompt))
     
-    # If it was an insert or something else, we could handle it here.
-    # But for this case, let's just make sure Rito is the active one.
-    
     conn.commit()
-    conn.close()
     print("Successfully updated persona to Rito.")
 
 if __name__ == "__main__":
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Add project root to path once for the whole test suite, so `from src...` imports resolve
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
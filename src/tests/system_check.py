@@ -2,10 +2,38 @@
 System Health Check Module
 Tests all components and reports status
 """
+import asyncio
+import functools
+import importlib.util
 import subprocess
 import os
+import shutil
 import sys
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Seconds `goose --version` may take; a healthy binary answers well under a second
+GOOSE_CHECK_TIMEOUT = float(os.getenv("GOOSE_CHECK_TIMEOUT", "2"))
+
+# pip package -> top-level module it installs
+REQUIRED_PACKAGES = {
+    "requests": "requests",
+    "python-dotenv": "dotenv",
+    "loguru": "loguru",
+    "Pillow": "PIL",
+    "mss": "mss",
+    "streamlit": "streamlit",
+    "discord.py": "discord",
+    "pandas": "pandas",
+    "duckduckgo-search": "duckduckgo_search",
+}
+
+def _is_installed(module: str) -> bool:
+    """Whether a module is importable, found without running its code (pandas/streamlit imports take 100s of ms)"""
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
 
 def check_database() -> Tuple[bool, str]:
     """Check if database is accessible"""
@@ -20,12 +48,21 @@ def check_database() -> Tuple[bool, str]:
     except Exception as e:
         return False, f"❌ Database Error: {str(e)}"
 
+@functools.lru_cache(maxsize=1)
+def _ollama_session():
+    """Keep-alive session so repeated Ollama checks reuse the connection"""
+    import requests
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 def check_ollama() -> Tuple[bool, str]:
     """Check if Ollama is running and accessible"""
     try:
-        import requests
         ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
-        response = requests.get(f"{ollama_url}/api/tags", timeout=5)
+        response = _ollama_session().get(f"{ollama_url}/api/tags", timeout=5)
         if response.status_code == 200:
             models = response.json().get("models", [])
             model_names = [m.get("name", "") for m in models]
@@ -51,62 +88,66 @@ def check_vision_adapter() -> Tuple[bool, str]:
 
 def check_discord_bot() -> Tuple[bool, str]:
     """Check if Discord bot dependencies are available"""
-    try:
-        import discord
-        token = os.getenv("DISCORD_BOT_TOKEN")
-        if not token:
-            return False, "⚠️ Discord Token not configured in .env"
-        return True, "✅ Discord.py installed, token configured"
-    except ImportError:
+    if not _is_installed("discord"):
         return False, "❌ discord.py not installed"
-    except Exception as e:
-        return False, f"❌ Discord Error: {str(e)}"
+    token = os.getenv("DISCORD_BOT_TOKEN")
+    if not token:
+        return False, "⚠️ Discord Token not configured in .env"
+    return True, "✅ Discord.py installed, token configured"
 
-def check_goose_cli() -> Tuple[bool, str]:
-    """Check if Goose CLI is installed"""
-    # 1. Check if in PATH
-    try:
-        # Using shell=True and where command to be sure on Windows
-        result = subprocess.run(
-            ["goose", "--version"],
-            capture_output=True,
-            text=True,
-            timeout=15, # Increased timeout
-            shell=True
-        )
-        if result.returncode == 0:
-            return True, f"✅ Goose CLI OK ({result.stdout.strip()})"
-    except Exception:
-        pass
-
-    # 2. Try common bin locations on Windows (deduplicated)
+@functools.lru_cache(maxsize=1)
+def _candidate_goose_paths() -> Tuple[str, ...]:
+    """Common Goose install locations on Windows (deduplicated); fixed for the process lifetime"""
+    home = os.path.expanduser("~")
     raw_paths = [
         os.path.join(os.environ.get("LOCALAPPDATA", ""), "pipx", "bin", "goose.exe"),
-        os.path.join(os.path.expanduser("~"), ".local", "bin", "goose.exe"),
-        os.path.join(os.path.expanduser("~"), "AppData", "Local", "bin", "goose.exe"),
+        os.path.join(home, ".local", "bin", "goose.exe"),
+        os.path.join(home, "AppData", "Local", "bin", "goose.exe"),
     ]
-    # Remove duplicates and non-existent paths
-    paths_to_check = list(set([p for p in raw_paths if p]))
-    
+    return tuple(dict.fromkeys(raw_paths))
+
+def _goose_timeout_message(path: str) -> str:
+    return f"⚠️ Goose CLI found at {path} but did not answer --version within {GOOSE_CHECK_TIMEOUT:g}s."
+
+def _probe_goose_cli() -> Tuple[bool, str, Optional[str]]:
+    """Locate and run Goose CLI; returns (status, message, path it was found at)"""
+    # 1. Check if in PATH (a plain PATH scan; only spawn goose once it is known to exist)
+    path = shutil.which("goose")
+    if path:
+        try:
+            # Resolved path, so no shell process is needed
+            result = subprocess.run(
+                [path, "--version"],
+                capture_output=True,
+                text=True,
+                timeout=GOOSE_CHECK_TIMEOUT
+            )
+            if result.returncode == 0:
+                return True, f"✅ Goose CLI OK ({result.stdout.strip()})", path
+        except subprocess.TimeoutExpired:
+            return False, _goose_timeout_message(path), None
+        except Exception:
+            pass
+
     found_errors = []
-    for path in paths_to_check:
+    # 2. Try common bin locations on Windows
+    for path in _candidate_goose_paths():
         if os.path.exists(path):
             try:
-                # Try execution with longer timeout and shell=True
+                # Try execution with longer timeout
                 result = subprocess.run(
                     [path, "--version"], 
                     capture_output=True, 
                     text=True, 
-                    timeout=15,
-                    shell=True
+                    timeout=GOOSE_CHECK_TIMEOUT
                 )
                 if result.returncode == 0:
-                    return True, f"✅ Goose CLI OK (Detected at: {path})"
+                    return True, f"✅ Goose CLI OK (Detected at: {path})", path
                 else:
                     found_errors.append(f"Exec fail ({result.returncode})")
             except subprocess.TimeoutExpired:
-                # If it exists but times out, it's likely installed but slow
-                return True, f"⚠️ Goose CLI Found at {path} but timed out during check. It should work."
+                # Installed, but a binary that can't print its version in time is not healthy
+                return False, _goose_timeout_message(path), None
             except Exception as e:
                 found_errors.append(f"Error: {type(e).__name__}")
                 continue
@@ -115,75 +156,69 @@ def check_goose_cli() -> Tuple[bool, str]:
     if found_errors:
         err_msg += f" (Note: {', '.join(set(found_errors))})"
         
-    return False, err_msg
+    return False, err_msg, None
+
+# (path, result) of the last successful Goose check; the binary doesn't move while the process runs
+_goose_cache: Optional[Tuple[str, Tuple[bool, str]]] = None
+
+def invalidate_goose_cache():
+    """Forget the cached Goose location so the next check probes again"""
+    global _goose_cache
+    _goose_cache = None
+
+def check_goose_cli() -> Tuple[bool, str]:
+    """Check if Goose CLI is installed"""
+    global _goose_cache
+    if _goose_cache is not None and os.path.exists(_goose_cache[0]):
+        return _goose_cache[1]
+    status, message, path = _probe_goose_cli()
+    _goose_cache = (path, (status, message)) if status else None
+    return status, message
 
 def check_search_adapter() -> Tuple[bool, str]:
     """Check if SearchAdapter dependencies are available"""
-    try:
-        from duckduckgo_search import DDGS
+    if _is_installed("duckduckgo_search"):
         return True, "✅ DuckDuckGo Search available"
-    except ImportError:
-        return False, "❌ duckduckgo-search not installed"
-    except Exception as e:
-        return False, f"❌ Search Error: {str(e)}"
+    return False, "❌ duckduckgo-search not installed"
 
 def check_dependencies() -> Tuple[bool, str]:
     """Check if all required packages are installed"""
-    required = [
-        "requests",
-        "python-dotenv",
-        "loguru",
-        "Pillow",
-        "mss",
-        "streamlit",
-        "discord.py",
-        "pandas",
-        "duckduckgo-search"
-    ]
-    
-    missing = []
-    for package in required:
-        try:
-            if package == "Pillow":
-                __import__("PIL")
-            elif package == "discord.py":
-                __import__("discord")
-            elif package == "python-dotenv":
-                __import__("dotenv")
-            elif package == "duckduckgo-search":
-                __import__("duckduckgo_search")
-            else:
-                __import__(package.replace("-", "_"))
-        except ImportError:
-            missing.append(package)
+    missing = [package for package, module in REQUIRED_PACKAGES.items() if not _is_installed(module)]
     
     if missing:
         return False, f"❌ Missing packages: {', '.join(missing)}"
     else:
-        return True, f"✅ All {len(required)} required packages installed"
+        return True, f"✅ All {len(REQUIRED_PACKAGES)} required packages installed"
+
+CHECKS = [
+    ("Database", check_database),
+    ("Ollama LLM", check_ollama),
+    ("Vision Adapter", check_vision_adapter),
+    ("Discord Bot", check_discord_bot),
+    ("Goose CLI", check_goose_cli),
+    ("Search Adapter", check_search_adapter),
+    ("Dependencies", check_dependencies),
+]
+
+def _format_results(outcomes: List[Tuple[bool, str]]) -> List[Dict[str, any]]:
+    # Outcomes arrive in CHECKS order (executor.map / gather), so no re-sorting is needed
+    return [
+        {"component": name, "status": status, "message": message}
+        for (name, _), (status, message) in zip(CHECKS, outcomes)
+    ]
 
 def run_all_checks() -> List[Dict[str, any]]:
     """Run all health checks and return results"""
-    checks = [
-        ("Database", check_database),
-        ("Ollama LLM", check_ollama),
-        ("Vision Adapter", check_vision_adapter),
-        ("Discord Bot", check_discord_bot),
-        ("Goose CLI", check_goose_cli),
-        ("Search Adapter", check_search_adapter),
-        ("Dependencies", check_dependencies),
-    ]
-    
-    results = []
-    for name, check_func in checks:
-        status, message = check_func()
-        results.append({
-            "component": name,
-            "status": status,
-            "message": message
-        })
+    # Checks are independent I/O probes, so run them concurrently
+    with ThreadPoolExecutor(max_workers=len(CHECKS)) as executor:
+        outcomes = list(executor.map(lambda check: check[1](), CHECKS))
     
-    return results
+    return _format_results(outcomes)
+
+async def run_all_checks_async() -> List[Dict[str, any]]:
+    """run_all_checks for callers already inside an event loop"""
+    outcomes = await asyncio.gather(*(asyncio.to_thread(check) for _, check in CHECKS))
+    return _format_results(outcomes)
 
 if __name__ == "__main__":
     print("Running system diagnostics...\n")
@@ -1,8 +1,4 @@
 import os
-import sys
-# Add project root to path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-
 from src.core.docker_manager import DockerManager
 from src.controller.policy import Controller
 
@@ -23,8 +23,10 @@ def test_config_system():
     # 2. Disable screenshots with a REASON
     print("\n[Test 2] Disabling screenshots with a specific reason...")
     disable_reason = "Privacy protection activated during sensitive work."
-    db.set_config("allow_screenshots", False, reason=disable_reason)
-    db.set_config("screenshot_disable_reason", disable_reason, reason="Metadata sync")
+    db.set_configs([
+        ("allow_screenshots", False, disable_reason),
+        ("screenshot_disable_reason", disable_reason, "Metadata sync"),
+    ])
     
     # 3. Verify Controller blocks it
     print("\n[Test 3] Controller Policy Check (Disabled)...")
@@ -43,9 +45,11 @@ def test_config_system():
     print("\n[Test 5] Checking Audit Log for 'allow_screenshots'...")
     with db.get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM config_audit_log WHERE key = 'allow_screenshots' ORDER BY timestamp DESC")
-        logs = cursor.fetchall()
-        for log in logs:
+        cursor.execute(
+            "SELECT * FROM config_audit_log WHERE key = ? ORDER BY timestamp DESC LIMIT ?",
+            ("allow_screenshots", 10)
+        )
+        for log in cursor:
             print(f"- Change: {log['old_value']} -> {log['new_value']} | Reason: {log['reason']}")
 
 if __name__ == "__main__":
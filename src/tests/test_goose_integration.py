@@ -1,5 +1,3 @@
-import os
-import sys
 from src.adapter.goose import GooseAdapter
 
 def test_goose_integration():
@@ -29,6 +27,4 @@ def test_goose_integration():
         print(f"❌ Goose execution FAILED: {result.get('error')}")
 
 if __name__ == "__main__":
-    # Ensure src is in path
-    sys.path.append(os.getcwd())
     test_goose_integration()